@@ -0,0 +1,90 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+# Compares the old loop version of the blob Cellular Automata with the numpy kernel in src.world_gen,
+# checks that both give the exact same blobs and prints how long each of them took.
+# Run from the root of the repository with: python benchmarks/blob_ca.py [seed] [blobs per generator]
+
+from time import perf_counter
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DMC_SEED"] = sys.argv[1] if len(sys.argv) > 1 else "50687767"
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import src.constants # src.constants has to be imported before src.world_gen because of circular imports
+from src.world_gen import BlobGenerator, structure_generators, rng
+
+def loop_CA(generator: BlobGenerator, origin: tuple) -> dict:
+    """The loop version of BlobGenerator.CA from before the numpy kernel, kept as the reference"""
+
+    size, density, cycles = generator.max_size, generator.density, generator.cycles
+    is_empty = True
+    retries = 0
+    while is_empty:
+        blob = np.empty((size[1], size[0]))
+
+        for y in range(size[1]):
+            for x in range(size[0]):
+                blob[y, x] = not rng.rand_bool(density / 11, *origin, generator.feature, draw=(retries * size[1] + y) * size[0] + x)
+        retries += 1
+
+        neighbors_offset = [(-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0)]
+
+        for _ in range(cycles):
+            for y, line in enumerate(blob):
+                for x, block in enumerate(line):
+                    neighbors = 0
+                    for n in neighbors_offset:
+                        try:
+                            if blob[y + n[0], x + n[1]]:
+                                neighbors += 1
+                        except: pass
+                    if neighbors <= 3:
+                        blob[y, x] = False
+                    elif neighbors > 5:
+                        blob[y, x] = True
+
+        blob_dict = {}
+        for y, line in enumerate(blob):
+            for x, block in enumerate(line):
+                if block:
+                    is_empty = False
+                    blob_dict[(x, y)] = generator.name
+
+    return blob_dict
+
+def main() -> None:
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    generators = [generator for generator in structure_generators.values() if isinstance(generator, BlobGenerator)]
+    origins = [(int(x), int(y)) for x, y in np.random.default_rng(0).integers(-100000, 100000, (count, 2))]
+
+    print(f"{'blob':<24}{'size':<10}{'loop (ms)':>12}{'numpy (ms)':>12}{'speedup':>10}")
+    total_loop = total_numpy = 0
+    for generator in generators:
+        start = perf_counter()
+        expected = [loop_CA(generator, origin) for origin in origins]
+        loop_time = perf_counter() - start
+
+        generator.blobs.clear()
+        start = perf_counter()
+        blobs = generator.CA(origins)
+        numpy_time = perf_counter() - start
+
+        if blobs != expected:
+            raise AssertionError(f"The numpy kernel gave different {generator.name} blobs than the loop version")
+        total_loop += loop_time
+        total_numpy += numpy_time
+        print(f"{generator.name:<24}{str(generator.max_size):<10}{loop_time * 1000:>12.1f}{numpy_time * 1000:>12.1f}{loop_time / numpy_time:>9.1f}x")
+
+    print(f"{'total':<34}{total_loop * 1000:>12.1f}{total_numpy * 1000:>12.1f}{total_loop / total_numpy:>9.1f}x")
+    print(f"{count} blobs per generator, all blobs identical")
+
+if __name__ == "__main__":
+    main()
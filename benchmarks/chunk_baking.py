@@ -0,0 +1,69 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+# Compares drawing the blocks of chunks one Block.draw call per block (the way chunks were baked before the block atlas)
+# with Chunk.draw_blocks, which draws the whole chunk from the atlas with a single Surface.blits call. It checks that both
+# give the exact same images and prints how long each of them took, and how long baking takes with the scale on top.
+# Run from the root of the repository with: python benchmarks/chunk_baking.py [seed] [chunks]
+
+from time import perf_counter
+from pygame.transform import scale
+from pygame import Surface
+import pygame
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DMC_SEED"] = sys.argv[1] if len(sys.argv) > 1 else "50687767"
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import src.constants # src.constants has to be imported before src.world_gen because of circular imports
+from src.constants import CHUNK_SIZE, MIN_BLOCK_SIZE, BLOCK_SIZE
+from src.world_gen import Chunk
+from src.block import Block
+
+def blit_draw_blocks(blocks: list[Block]) -> Surface:
+    """The per block version of Chunk.draw_blocks from before the block atlas, kept as the reference"""
+
+    image = Surface((MIN_BLOCK_SIZE * CHUNK_SIZE, MIN_BLOCK_SIZE * CHUNK_SIZE)).convert()
+    image.set_colorkey((0, 0, 0))
+    for block in blocks:
+        block.draw(image, None)
+    return image
+
+def main() -> None:
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    # A band of chunks from the sky down into the caves, 40 chunks wide
+    chunks = [Chunk((i % 40 - 20, i // 40 - 2)) for i in range(count)]
+    # The blocks already exist when the game bakes a chunk (see Chunk.update), so they are created outside of the timing
+    blocks = [[Block(chunk, pos, name) for pos, name in chunk.block_data.items()] for chunk in chunks]
+
+    blit_time = atlas_time = scale_time = 0
+    for chunk, chunk_blocks in zip(chunks, blocks):
+        start = perf_counter()
+        expected = blit_draw_blocks(chunk_blocks)
+        blit_time += perf_counter() - start
+
+        start = perf_counter()
+        image = chunk.draw_blocks()
+        atlas_time += perf_counter() - start
+
+        if pygame.image.tobytes(image, "RGB") != pygame.image.tobytes(expected, "RGB"):
+            raise AssertionError(f"The atlas gave a different image for chunk {chunk.pos}")
+
+        # Both paths scale the image up the same way to finish baking it
+        start = perf_counter()
+        scale(image, (BLOCK_SIZE * CHUNK_SIZE, BLOCK_SIZE * CHUNK_SIZE))
+        scale_time += perf_counter() - start
+
+    print(f"{'path':<24}{'draw (ms)':>12}{'per chunk (ms)':>16}{'with scale (ms)':>18}")
+    for name, time in (("Block.draw", blit_time), ("atlas + blits", atlas_time)):
+        print(f"{name:<24}{time * 1000:>12.1f}{time * 1000 / count:>16.3f}{(time + scale_time) * 1000:>18.1f}")
+    print(f"{count} chunks, {sum(map(len, blocks))} blocks, drawing the blocks is {blit_time / atlas_time:.1f}x faster with the atlas")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+# Saves a square of generated chunks to region files in a temporary folder, loads them back from a fresh WorldStorage,
+# checks that every chunk came back the same and prints the save and load throughput and the size on disk.
+# Run from the root of the repository with: python benchmarks/region_files.py [seed] [chunks]
+
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from math import isqrt
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DMC_SEED"] = sys.argv[1] if len(sys.argv) > 1 else "50687767"
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import src.constants # src.constants has to be imported before src.world_gen because of circular imports
+from src.constants import BLOCKS, CHUNK_SIZE
+from src.world_gen import generate_terrain
+from src.region_file import WorldStorage
+from src.block import BlockData
+
+def main() -> None:
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    side = isqrt(count - 1) + 1
+    chunks = [(x, y) for y in range(-side // 2, side - side // 2) for x in range(-side // 2, side - side // 2)][:count]
+
+    start = perf_counter()
+    chunk_data = {}
+    for i in range(0, len(chunks), 1024):
+        batch = chunks[i:i + 1024]
+        for chunk, terrain in zip(batch, generate_terrain(batch)):
+            chunk_data[chunk] = BlockData(chunk, {
+                (chunk[0] * CHUNK_SIZE + x, chunk[1] * CHUNK_SIZE + y): BLOCKS.names[terrain[y, x]]
+                for y, x in zip(*terrain.nonzero())
+            })
+    print(f"generated {len(chunks)} chunks in {perf_counter() - start:.2f}s")
+
+    with TemporaryDirectory() as directory:
+        storage = WorldStorage(directory)
+        start = perf_counter()
+        storage.save(chunk_data)
+        save_time = perf_counter() - start
+        storage.close()
+
+        size = sum(entry.stat().st_size for entry in os.scandir(directory))
+        regions = len(os.listdir(directory))
+
+        storage = WorldStorage(directory)
+        start = perf_counter()
+        loaded = {chunk: storage.load(chunk) for chunk in chunks}
+        load_time = perf_counter() - start
+        storage.close()
+
+    if loaded != chunk_data:
+        raise AssertionError("Some chunks were loaded back differently than they were saved")
+    print(f"saved  {len(chunks)} chunks in {save_time:.3f}s ({len(chunks) / save_time:,.0f} chunks/s)")
+    print(f"loaded {len(chunks)} chunks in {load_time:.3f}s ({len(chunks) / load_time:,.0f} chunks/s)")
+    print(f"{regions} region files, {size / 1024 / 1024:.2f} MiB ({size / len(chunks):.0f} bytes per chunk), all chunks identical")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+# Compares the old list based SpriteManager with the one in src.sprite, with a lot of particles alive at once. Every frame
+# the sprites are updated and drawn, and some of the particles die during the update while new ones are spawned, the way
+# particles do in the game. The sprites don't do anything themselves, so only the time spent in the sprite manager is measured.
+# Run from the root of the repository with: python benchmarks/sprites.py [particles] [frames]
+
+from __future__ import annotations
+
+from time import perf_counter
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.sprite import Sprite, SpriteManager, LayersEnum, SpriteNotFoundException
+
+class ListSpriteManager:
+    """The SpriteManager from before the layer list, kept as the reference"""
+
+    def __init__(self, *args: tuple[Sprite]) -> None:
+        self.layers = {}
+        if args:
+            self.add(*args)
+
+    def __iter__(self) -> ListSpriteManager:
+        self.layers = dict(sorted(self.layers.items()))
+        self.layeriter = self.spriteiter = 0
+        self.get_layer = lambda: list(self.layers.values())[self.layeriter-1]
+        return self
+
+    def __next__(self) -> Sprite:
+        if self.layeriter >= len(self.layers):
+            raise StopIteration
+
+        layer = self.get_layer()
+        self.spriteiter += 1
+        if self.spriteiter >= len(layer):
+            self.spriteiter = 0
+            while True:
+                self.layeriter += 1
+                if not LayersEnum(list(self.layers)[self.layeriter - 1]).name.endswith("_DEBUG"):
+                    layer = self.get_layer()
+                    break
+
+        return layer[self.spriteiter]
+
+    def add(self, *args: tuple[Sprite]) -> None:
+        for sprite in args:
+            if sprite._layer != sprite._debug_layer:
+                if sprite._debug_layer not in self.layers:
+                    self.layers[sprite._debug_layer] = [sprite]
+                else:
+                    self.layers[sprite._debug_layer].append(sprite)
+
+            if sprite._layer not in self.layers:
+                self.layers[sprite._layer] = [sprite]
+            else:
+                self.layers[sprite._layer].append(sprite)
+
+    def remove(self, sprite: Sprite) -> None:
+        try:
+            self.layers[sprite._layer].remove(sprite)
+            if sprite._layer != sprite._debug_layer:
+                self.layers[sprite._debug_layer].remove(sprite)
+        except ValueError:
+            raise SpriteNotFoundException(sprite)
+
+        if not self.layers[sprite._layer]:
+            del self.layers[sprite._layer]
+
+    def draw(self, screen, debug: bool, **kwargs) -> None:
+        for layer in (layers := self.layers.copy()):
+            for sprite in layers[layer]:
+                if not LayersEnum(layer).name.endswith("_DEBUG"):
+                    sprite.draw(screen, **kwargs)
+                if debug:
+                    if LayersEnum(layer).name.endswith("_DEBUG") or sprite._layer == sprite._debug_layer:
+                        sprite.debug(screen, **kwargs)
+
+    def update(self, dt: float, **kwargs) -> None:
+        for sprite in self:
+            sprite.update(dt, **kwargs)
+
+class BenchSprite(Sprite):
+    """A sprite that does nothing, and isn't added to the game's SPRITE_MANAGER"""
+
+    def __init__(self, manager, layer: LayersEnum, lifetime: int = -1) -> None:
+        self._layer = self._debug_layer = layer.value
+        self.manager = manager
+        self.lifetime = lifetime # In frames, -1 lives forever
+        manager.add(self)
+
+    def update(self, dt: float, **kwargs) -> None:
+        self.lifetime -= 1
+        if self.lifetime == 0:
+            self.manager.remove(self)
+            # A particle like the one that died is spawned, so that the number of particles stays the same
+            BenchSprite(self.manager, LayersEnum(self._layer), kwargs["lifetime"])
+
+def run(manager, particles: int, frames: int) -> tuple[float, float]:
+    """Times the updates and draws of the frames, returns (update seconds, draw seconds)"""
+
+    # The sprites of a game with a screen of chunks, the player and the HUD, then the particles
+    for layer in (LayersEnum.BACKGROUND, *[LayersEnum.BLOCKS] * 24, LayersEnum.PLAYER, LayersEnum.HOTBAR, LayersEnum.CROSSHAIR):
+        BenchSprite(manager, layer)
+    # Spread out lifetimes so that about 1 in lifetime particles dies every frame
+    lifetime = 100
+    for i in range(particles):
+        BenchSprite(manager, (LayersEnum.ENV_PARTICLES, LayersEnum.REG_PARTICLES)[i % 2], i % lifetime + 1)
+
+    update_time = draw_time = 0
+    for _ in range(frames):
+        start = perf_counter()
+        manager.update(0, lifetime=lifetime)
+        update_time += perf_counter() - start
+
+        start = perf_counter()
+        manager.draw(None, False)
+        draw_time += perf_counter() - start
+    return update_time, draw_time
+
+def main() -> None:
+    particles = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    print(f"{'sprite manager':<24}{'update (ms)':>14}{'draw (ms)':>12}{'frame (ms)':>12}")
+    times = {}
+    for name, manager in (("lists", ListSpriteManager()), ("layer list + sets", SpriteManager())):
+        update_time, draw_time = run(manager, particles, frames)
+        times[name] = (update_time + draw_time) / frames
+        print(f"{name:<24}{update_time * 1000 / frames:>14.2f}{draw_time * 1000 / frames:>12.2f}{times[name] * 1000:>12.2f}")
+    print(f"{particles} particles alive, {particles // 100} dying and spawning every frame, "
+          f"{times['lists'] / times['layer list + sets']:.1f}x faster with the layer list and sets")
+
+if __name__ == "__main__":
+    main()
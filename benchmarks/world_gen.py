@@ -0,0 +1,108 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+# Generates a rectangle of chunks without a window the same way as load_chunks: the structures of the rectangle and the chunks
+# around it are placed first, then the terrain of the rectangle is generated and its chunks are finalized. It prints the chunks
+# per second, the time spent in each stage of the chunk pipeline (see ChunkStatus), the hit rates of the caches and the peak
+# memory as JSON.
+# Every seed runs in its own process, since the seed is fixed when src.constants is imported. Without --seed, the seeds
+# listed in src.constants for profiling and testing are used as the standard scenarios.
+# Run from the root of the repository with: python benchmarks/world_gen.py [--seed SEED ...] [--rect X0 Y0 X1 Y1] [--output FILE]
+
+from time import perf_counter
+import subprocess
+import argparse
+import json
+import sys
+import os
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+# The profiling seed, the structure generation seeds and the low world generation seed from src.constants
+STANDARD_SEEDS = [50687767, -1797233725, -301804449, 1666679850, 1671665804, 1561761502]
+# The chunks that are generated, from (x0, y0) included to (x1, y1) excluded: the surface, and down through stone and caves
+DEFAULT_RECT = (-8, -2, 8, 14)
+
+def peak_rss() -> int | None:
+    """The peak resident memory of this process in bytes, or None if it can't be measured"""
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # Bytes on macOS, kilobytes everywhere else
+
+def run(seed: int, rect: tuple[int, int, int, int]) -> dict:
+    """Generates the chunks of the rectangle with the given seed, has to run in a process that hasn't imported src yet"""
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ["DMC_SEED"] = str(seed)
+    os.environ["SDL_VIDEODRIVER"] = "dummy" # Headless, the chunks are never drawn
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1" # Keep the output pure JSON
+
+    import src.constants # src.constants has to be imported before src.world_gen because of circular imports
+    import src.world_gen as world_gen
+    from src.gen_cache import RegionCache
+
+    x0, y0, x1, y1 = rect
+    reach_x, reach_y = world_gen.STRUCTURE_REACH
+    chunks = [(x, y) for y in range(y0, y1) for x in range(x0, x1)]
+    start = perf_counter()
+    # The same stages as load_chunks: the structures of the chunks around the rectangle, then the terrain of the rectangle in a batch
+    world_gen.chunk_pipeline.advance([(x, y) for y in range(y0 - reach_y, y1 + reach_y) for x in range(x0 - reach_x, x1 + reach_x)], world_gen.ChunkStatus.BLOBS)
+    world_gen.chunk_pipeline.advance(chunks, world_gen.ChunkStatus.DECORATION)
+    for chunk in chunks:
+        world_gen.Chunk(chunk)
+    total = perf_counter() - start
+
+    pipeline = world_gen.chunk_pipeline
+    stages = {stage.name.lower(): pipeline.times[stage] for stage in pipeline.times}
+    stages["other"] = total - sum(stages.values()) # Building the block data and the sprites...
+    caches = {name: cache.stats() for name, cache in RegionCache.instances.items()}
+    cave_tiles = world_gen.cave_tiles
+    caches["cave_tiles"] = {"hits": cave_tiles.hits, "misses": cave_tiles.misses, "size": len(cave_tiles.tiles),
+                            "hit_rate": cave_tiles.hits / (cave_tiles.hits + cave_tiles.misses) if cave_tiles.hits + cave_tiles.misses else 0.0}
+
+    return {
+        "seed": seed,
+        "rect": list(rect),
+        "chunks": len(chunks),
+        "seconds": total,
+        "chunks_per_second": len(chunks) / total,
+        "stage_seconds": stages,
+        "caches": caches,
+        "peak_rss_bytes": peak_rss()
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless world generation benchmark")
+    parser.add_argument("--seed", type=int, action="append", help="a seed to generate, can be given more than once (default: the standard scenarios)")
+    parser.add_argument("--rect", type=int, nargs=4, default=DEFAULT_RECT, metavar=("X0", "Y0", "X1", "Y1"), help="the chunks to generate, x1 and y1 excluded")
+    parser.add_argument("--output", help="write the JSON to this file instead of printing it")
+    args = parser.parse_args()
+    seeds = args.seed or STANDARD_SEEDS
+
+    if len(seeds) == 1:
+        results = run(seeds[0], tuple(args.rect))
+    else:
+        # A fresh process for every seed, which also keeps the caches and the peak memory of the seeds apart
+        results = []
+        for seed in seeds:
+            results.append(json.loads(subprocess.run([sys.executable, __file__, "--seed", str(seed), "--rect", *map(str, args.rect)],
+                                                     capture_output=True, text=True, check=True).stdout))
+
+    output = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,23 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from src.constants import MANAGER
+from multiprocessing import freeze_support
+import argparse
+import sys
+import os
 
 if __name__ == "__main__":
-    MANAGER.new().run()
\ No newline at end of file
+    freeze_support() # The chunk worker processes need this to work in the exe
+    if len(sys.argv) > 1 and sys.argv[1] == "pregen":
+        # Generate an area of a world ahead of time without opening the game, see src.pregen
+        from src.pregen import main
+        main(sys.argv[2:])
+    else:
+        parser = argparse.ArgumentParser(prog="main.py", description="Play 2DMC, or generate an area of a world ahead of time with: main.py pregen")
+        parser.add_argument("--seed", type=int, help="the seed of the world to open, the world saved with that seed is loaded if there is one (default: a new random seed)")
+        args = parser.parse_args()
+        if args.seed is not None:
+            os.environ["DMC_SEED"] = str(args.seed) # Read by src.constants, and passed on to the chunk worker processes
+        # Imported here so that the chunk worker processes don't open a window when they import this file
+        from src.constants import MANAGER
+        MANAGER.new().run()
\ No newline at end of file
@@ -5,24 +5,137 @@
 # The majority of the game assets are properties of Mojang Studios,
 # you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
 
+from __future__ import annotations
+from collections.abc import MutableMapping
+import numpy as np
 import pygame
 
-from src.constants import VEC, MIN_BLOCK_SIZE, BLOCK_SIZE, CHUNK_SIZE, BLOCK_DATA
+from src.constants import VEC, MIN_BLOCK_SIZE, BLOCK_SIZE, CHUNK_SIZE, BLOCK_DATA, BLOCKS, BLOCK_IDS, BLOCK_NAMES
 from src.particle import BlockParticle
 from src.images import BLOCK_TEXTURES
 from src.utils import inttup
 
-class BlockData(dict):
-    def __missing__(self, key):
-        return ""
+class BlockData(MutableMapping):
+    """The blocks of a chunk, stored as a CHUNK_SIZE by CHUNK_SIZE array of indices into a palette of block names
+
+    It can be used like a dict of {block position: block name} that only contains the blocks that aren't air, and just like
+    the dict it replaces, getting a position that has no block gives "" (air).
+    """
+
+    def __init__(self, chunk: tuple[int, int], blocks: dict = {}) -> None:
+        """
+        Args:
+            chunk (tuple[int, int]): The position of the chunk
+            blocks (dict, optional): The blocks to start with, as {block position: block name}. Defaults to {}.
+        """
+
+        self.chunk = chunk
+        self.origin = (chunk[0] * CHUNK_SIZE, chunk[1] * CHUNK_SIZE)
+        self.palette = [""] # Index 0 is always air
+        self.palette_ids = {"": 0}
+        self.blocks = np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=np.uint8) # Palette indices indexed by [y, x]
+        self.version = 0 # Goes up every time a block changes, so it is cheap to check if the chunk has changed
+        self.dirty = set() # The [y, x] indices of the blocks that changed since the chunk was last drawn
+        self.items_version = None
+        self.items_cache = []
+        self.update(blocks)
+
+    def index(self, pos: tuple) -> tuple[int, int] | None:
+        """Gets the [y, x] index of a block position in the array, or None if the position is not in this chunk"""
+        x, y = int(pos[0]) - self.origin[0], int(pos[1]) - self.origin[1]
+        if 0 <= x < CHUNK_SIZE and 0 <= y < CHUNK_SIZE:
+            return y, x
+
+    def palette_id(self, name: str) -> int:
+        """Gets the palette index of a block name, adding it to the palette if it isn't in it yet"""
+        if name not in self.palette_ids:
+            if len(self.palette) > np.iinfo(self.blocks.dtype).max:
+                self.compact()
+            self.palette_ids[name] = len(self.palette)
+            self.palette.append(name)
+        return self.palette_ids[name]
+
+    def compact(self) -> None:
+        """Removes the names that aren't used by any block anymore from the palette"""
+        used = np.unique(self.blocks)
+        used = used[used != 0]
+        remap = np.zeros(len(self.palette), dtype=self.blocks.dtype)
+        remap[used] = np.arange(1, len(used) + 1)
+        self.blocks = remap[self.blocks]
+        self.palette = ["", *(self.palette[id] for id in used)]
+        self.palette_ids = {name: id for id, name in enumerate(self.palette)}
+
+    def __getitem__(self, pos: tuple) -> str:
+        if (index := self.index(pos)) is None:
+            return ""
+        return self.palette[self.blocks[index]]
+
+    def __setitem__(self, pos: tuple, name: str) -> None:
+        if (index := self.index(pos)) is None:
+            raise KeyError(f"{pos} is not in chunk {self.chunk}")
+        # Structures spilling into a chunk often set blocks to what they already are, which isn't a change
+        if self.blocks[index] != (id := self.palette_id(name)):
+            self.blocks[index] = id
+            self.version += 1
+            self.dirty.add(index)
+
+    def __delitem__(self, pos: tuple) -> None:
+        if (index := self.index(pos)) is None or not self.blocks[index]:
+            raise KeyError(pos)
+        self.blocks[index] = 0
+        self.version += 1
+        self.dirty.add(index)
+
+    def __contains__(self, pos: tuple) -> bool:
+        return (index := self.index(pos)) is not None and bool(self.blocks[index])
+
+    def __iter__(self):
+        return (pos for pos, _ in self.items())
+
+    def __len__(self) -> int:
+        return len(self.items())
+
+    def get(self, pos: tuple, default=None) -> str | None:
+        return self[pos] if pos in self else default
+
+    def block_ids(self) -> np.ndarray:
+        """Gets the blocks as an array of block ids (see BlockRegistry) instead of palette indices, indexed by [y, x]"""
+        return np.array([BLOCK_IDS[name] for name in self.palette], dtype=np.uint16)[self.blocks]
+
+    def items(self) -> list[tuple[tuple[int, int], str]]:
+        """Gets a list of (block position, block name) of every block that isn't air, rebuilt only when the blocks change"""
+
+        if self.items_version != self.version:
+            ys, xs = np.nonzero(self.blocks)
+            names = [self.palette[id] for id in self.blocks[ys, xs].tolist()]
+            self.items_cache = [((self.origin[0] + x, self.origin[1] + y), name) for x, y, name in zip(xs.tolist(), ys.tolist(), names)]
+            self.items_version = self.version
+        return self.items_cache
+
+    def copy(self) -> BlockData:
+        block_data = BlockData.__new__(BlockData)
+        block_data.__dict__.update(self.__dict__)
+        block_data.palette = self.palette.copy()
+        block_data.palette_ids = self.palette_ids.copy()
+        block_data.blocks = self.blocks.copy()
+        block_data.dirty = self.dirty.copy()
+        return block_data
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, BlockData):
+            return self.origin == other.origin and np.array_equal(np.array(self.palette, dtype=object)[self.blocks],
+                                                                  np.array(other.palette, dtype=object)[other.blocks])
+        return super().__eq__(other)
 
 class Block:
     """Class that handles the managaing, updating and drawing of blocks."""
     instances = {}
+    journal = None # The BlockJournal that the blocks the player changes are recorded in, if there is one
 
     def __init__(self, chunk, pos: tuple, name: str):
         __class__.instances[tuple(pos)] = self
         self.name = name
+        self.id = BLOCK_IDS[self.name]
         self.data = BLOCK_DATA[self.name]
         self.chunk = chunk
         self.coords = VEC(pos)
@@ -36,15 +149,15 @@ class Block:
         self.image = BLOCK_TEXTURES[self.name]
 
         # Different hitbox types (currently only two)
-        if self.data["collision_box"] == "full":
+        if BLOCKS.solid[self.id]:
             self.rect = pygame.Rect(self.pos, (BLOCK_SIZE, BLOCK_SIZE))
-        elif self.data["collision_box"] == "none":
+        else:
             self.rect = pygame.Rect(self.pos, (0, 0))
 
     def update(self, chunks):
         # Check if the block is supported, if not then remove the block
         if not is_supported(self.pos, self.data, self.neighbors):
-            remove_block(chunks, self.coords, self.data, self.neighbors)
+            remove_block(chunks, self.coords, self.neighbors)
 
     def draw(self, screen, camera):
         on_chunk_pos = self.pos.x / BLOCK_SIZE % CHUNK_SIZE * MIN_BLOCK_SIZE, self.pos.y / BLOCK_SIZE % CHUNK_SIZE * MIN_BLOCK_SIZE
@@ -58,13 +171,12 @@ class Block:
     def calc_pos(self, camera) -> None:
         self.rect.topleft = self.pos - camera.pos
 
-def remove_block(chunks: dict, pos: tuple, data: dict, neighbors: dict) -> None:
+def remove_block(chunks: dict, pos: tuple, neighbors: dict) -> None:
     """Remove the block at the position given
 
     Args:
         chunks (dict): A dictionary containing all the chunks
         pos (tuple): The position which has a block to remove
-        data (dict): Dictionary of block data
         neighbors (dict): The neighbours of the block to remove
     """
 
@@ -73,13 +185,15 @@ def remove_block(chunks: dict, pos: tuple, data: dict, neighbors: dict) -> None:
     BlockParticle.spawn(pos, Block.instances)
     chunk = (pos[0] // CHUNK_SIZE, pos[1] // CHUNK_SIZE)
     # If the block is layered, instead of removing the block completely, change that block to the next layer
-    if "next_layer" in data:
-        Block.instances[pos] = Block(chunk, pos, data["next_layer"])
-        chunks[chunk].block_data[pos] = data["next_layer"]
+    if (next_layer := BLOCKS.next_layer[Block.instances[pos].id]):
+        Block.instances[pos] = Block(chunk, pos, BLOCK_NAMES[next_layer])
+        chunks[chunk].block_data[pos] = BLOCK_NAMES[next_layer]
     else:
         # Remove the block from both the blocks dictionary AND the chunk information
         del Block.instances[pos]
         del chunks[chunk].block_data[pos]
+    if Block.journal:
+        Block.journal.append(pos, BLOCK_NAMES[next_layer])
     # After the block breaks, update its neighbors
     for neighbor in neighbors:
         if neighbors[neighbor] in Block.instances:
@@ -105,6 +219,8 @@ def updated_set_block(chunks: dict, pos: tuple, name: str, neighbors: dict) -> N
     """
 
     set_block(chunks, pos, name)
+    if Block.journal:
+        Block.journal.append(inttup(pos), name)
     for neighbor in neighbors:
         # Update the neighboring blocks
         if neighbors[neighbor] in Block.instances:
@@ -125,7 +241,7 @@ def is_occupied(player, pos: tuple) -> bool:
     if not pygame.Rect(VEC(pos) * BLOCK_SIZE, (BLOCK_SIZE, BLOCK_SIZE)).colliderect(pygame.Rect(player.pos, player.size)):
         if pos in Block.instances: # If there is already a block there:
             # If the "replaceable" key is in the block's data, meaning that the block is directly replaceable (i.e. grass)
-            return "replaceable" not in Block.instances[pos].data # This will return False if the block is replaceable and vice versa
+            return not BLOCKS.replaceable[Block.instances[pos].id] # This will return False if the block is replaceable and vice versa
         else:
             return False
     return True
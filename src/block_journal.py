@@ -0,0 +1,248 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+from __future__ import annotations
+from threading import Thread, Lock, Event
+from pathlib import Path
+import struct
+import os
+
+from src.constants import CHUNK_SIZE, BLOCKS, JOURNAL_SYNC_INTERVAL
+from src.block import BlockData
+from src.region_file import WorldStorage
+
+# Journal file format (all numbers are little endian):
+#     magic      4 bytes   b"2DMJ"
+#     version    uint16    JOURNAL_VERSION
+#     names      uint32 byte length followed by the block names that the ids in the records refer to, separated by "\n"
+#     records    one (x int32, y int32, block id uint16) for every block edit, in the order they were made, air is id 0
+# A crash can cut the last record in half, so anything after the last whole record is ignored when replaying.
+JOURNAL_MAGIC = b"2DMJ"
+JOURNAL_VERSION = 1
+HEADER = struct.Struct("<4sHI")
+RECORD = struct.Struct("<iiH")
+
+class BlockJournal:
+    """An append-only log of the blocks that the player changed, so that edits survive a crash without saving whole chunks
+
+    Appending an edit only packs it into a buffer in memory, so that placing and breaking blocks never waits for the disk.
+    A background thread writes and fsyncs the buffer every JOURNAL_SYNC_INTERVAL seconds, and the changed chunks are written
+    to the region files by another one when the journal is compacted.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """
+        Args:
+            path (str | Path): The journal file, it is only created once there is something to write to it
+        """
+
+        self.path = Path(path)
+        self.lock = Lock()      # Guards the buffer and the unapplied edits, it is never held while waiting for the disk
+        self.file_lock = Lock() # Guards the file, which is written to by the sync thread and the compaction thread
+        self.unapplied: dict[tuple[int, int], list[tuple[tuple[int, int], str]]] = {} # Edits from last time, by chunk
+        self.replayed = b""     # The records of every edit from last time, they stay in the file until a compaction
+        self.buffer = bytearray() # The records that haven't been written to the file yet
+        self.logged = 0         # The number of bytes of records appended so far, the position in the log of the edits
+        self.unsynced = False
+        self.compaction: Thread | None = None
+        self.saved: dict[tuple[int, int], int] = {} # The block data versions of the chunks that the compactions saved
+        self.error: Exception | None = None         # The exception of the last compaction, if it failed
+        self.file = None # Created by the sync thread once there is something to write, so that a world that is never changed leaves no files behind
+
+        if self.path.exists():
+            self.replay()
+
+        self.stopping = Event()
+        self.syncer = Thread(target=self.sync_loop, name="journal sync", daemon=True)
+        self.syncer.start()
+
+    def header(self) -> bytes:
+        names = "\n".join(BLOCKS.names).encode()
+        return HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, len(names)) + names
+
+    def replay(self) -> None:
+        """Reads the edits left in the journal by the last session, they are applied to their chunks as the chunks load"""
+
+        with open(self.path, "rb") as file:
+            data = file.read()
+        if len(data) < HEADER.size:
+            return
+        magic, version, names_length = HEADER.unpack_from(data)
+        if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+            raise ValueError(f"{self.path} is not a version {JOURNAL_VERSION} block journal")
+        start = HEADER.size + names_length
+        names = data[HEADER.size:start].decode().split("\n")
+
+        end = start + (len(data) - start) // RECORD.size * RECORD.size
+        records = []
+        for x, y, id in RECORD.iter_unpack(data[start:end]):
+            # Blocks that were removed from the game since then are skipped
+            if names[id] in BLOCKS.ids:
+                self.unapplied.setdefault((x // CHUNK_SIZE, y // CHUNK_SIZE), []).append(((x, y), names[id]))
+                records.append(RECORD.pack(x, y, BLOCKS.ids[names[id]]))
+        self.replayed = b"".join(records)
+
+    def start_file(self) -> None:
+        """Starts the file over with the current block names and the edits from last time, file_lock has to be held
+
+        The edits that were already applied are kept too, the chunks they were applied to are only saved by a compaction.
+        """
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.write_file(self.replayed)
+        self.replayed = b""
+        self.file = open(self.path, "r+b")
+        self.file.seek(0, os.SEEK_END)
+
+    def encode_unapplied(self) -> bytes:
+        with self.lock:
+            edits = [edit for chunk_edits in self.unapplied.values() for edit in chunk_edits]
+        return b"".join(RECORD.pack(*pos, BLOCKS.ids[name]) for pos, name in edits)
+
+    def write_file(self, records: bytes) -> None:
+        """Replaces the journal file with one that has the given records"""
+
+        # Write to a temporary file first so that the journal isn't lost if the game stops halfway through
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "wb") as file:
+            file.write(self.header() + records)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+
+    def append(self, pos: tuple[int, int], name: str) -> None:
+        """Records that the block at pos was set to name ("" for air)"""
+        with self.lock:
+            self.buffer += RECORD.pack(pos[0], pos[1], BLOCKS.ids[name])
+            self.logged += RECORD.size
+
+    def apply(self, chunk: tuple[int, int], block_data: BlockData) -> None:
+        """Applies the edits from last time to a chunk that just loaded, if there are any"""
+
+        with self.lock:
+            edits = self.unapplied.pop(chunk, ())
+        for pos, name in edits:
+            block_data[pos] = name
+
+    def write_buffer(self) -> int:
+        """Moves the buffered records into the file, file_lock has to be held
+
+        Returns:
+            int: The position in the log that the end of the file is at now
+        """
+
+        with self.lock:
+            records = bytes(self.buffer)
+            self.buffer.clear()
+            logged = self.logged
+        if records:
+            if self.file is None:
+                self.start_file()
+            self.file.write(records)
+            self.unsynced = True
+        return logged
+
+    def sync(self) -> None:
+        """Makes sure that every edit so far is on the disk"""
+
+        with self.file_lock:
+            self.write_buffer()
+            if self.unsynced:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.unsynced = False
+
+    def sync_loop(self) -> None:
+        while not self.stopping.wait(JOURNAL_SYNC_INTERVAL):
+            self.sync()
+
+    def compact(self, storage: WorldStorage, chunks: dict[tuple[int, int], BlockData], wait: bool = False) -> bool:
+        """Saves the chunks to the region files in the background, then drops the edits they contain from the journal
+
+        Args:
+            storage (WorldStorage): The region files to save the chunks to
+            chunks (dict): {chunk position: block data}, copies of every chunk changed since the last compaction
+            wait (bool, optional): Whether to wait for the last compaction if it is still running, for when the game closes.
+                                   Defaults to False.
+
+        Returns:
+            bool: False if the last compaction is still running, the chunks are then left for the next one
+        """
+
+        # Only one compaction at a time, and the game doesn't wait for the last one to finish while it is running
+        if self.compaction and self.compaction.is_alive():
+            if not wait:
+                return False
+            self.compaction.join()
+
+        with self.lock:
+            mark = self.logged # The chunks contain every edit up to here
+        # Edits from last time whose chunks haven't loaded yet are in none of the chunks, so they have to stay
+        kept = self.encode_unapplied()
+
+        self.compaction = Thread(target=self.rewrite, args=(storage, chunks, mark, kept), name="journal compaction")
+        self.compaction.start()
+        return True
+
+    def rewrite(self, storage: WorldStorage, chunks: dict[tuple[int, int], BlockData], mark: int, kept: bytes) -> None:
+        # The edits in the chunks have to be on the disk in the journal until the chunks are saved
+        with self.file_lock:
+            if self.file is None:
+                self.start_file()
+            logged = self.write_buffer()
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = False
+            mark = self.file.tell() - (logged - mark) # Where the edits that aren't in the chunks start in the file
+
+        try:
+            storage.save(chunks)
+        except Exception as error:
+            # The edits stay in the journal, and the chunks are saved again by the next compaction
+            with self.lock:
+                self.error = error
+            return
+
+        # Only the sync thread waits for the new journal, appending only ever takes the buffer's lock
+        with self.file_lock:
+            self.write_buffer()
+            self.file.flush()
+            self.file.seek(mark)
+            new = self.file.read() # The edits made while the chunks were being saved
+            self.file.close()
+            self.write_file(kept + new)
+            self.file = open(self.path, "r+b")
+            self.file.seek(0, os.SEEK_END)
+            self.unsynced = False
+        with self.lock:
+            self.saved.update((chunk, block_data.version) for chunk, block_data in chunks.items())
+
+    def take_saved(self) -> dict[tuple[int, int], int]:
+        """Collects the chunks that the compactions saved since the last call, and reports the compaction that failed if there is one
+
+        Returns:
+            dict: {chunk position: the version of the block data that was saved}
+        """
+
+        with self.lock:
+            saved, self.saved = self.saved, {}
+            error, self.error = self.error, None
+        if error is not None:
+            print(f"Saving the chunks failed, they will be saved again: {error!r}")
+        return saved
+
+    def close(self) -> None:
+        """Waits for the compaction, if there is one, and syncs the journal one last time"""
+
+        self.stopping.set()
+        self.syncer.join()
+        if self.compaction:
+            self.compaction.join()
+        self.sync()
+        with self.file_lock:
+            if self.file is not None:
+                self.file.close()
@@ -0,0 +1,87 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+import numpy as np
+
+class BlockRegistry:
+    """The block data compiled into integer ids and one numpy array per property, built once when the game starts
+
+    Every array is indexed by block id, so checking a property of a block is a single index instead of looking up the block's
+    JSON data by name and checking for keys. Id 0 is air, which has none of the properties.
+    """
+
+    def __init__(self, block_data: dict) -> None:
+        """
+        Args:
+            block_data (dict): The block data loaded from data/blocks (see load_block_data)
+        """
+
+        self.names = ["", *sorted(block_data)]
+        self.ids = {name: id for id, name in enumerate(self.names)}
+
+        count = len(self.names)
+        self.solid = np.zeros(count, dtype=bool)         # Has a full collision box
+        self.replaceable = np.zeros(count, dtype=bool)   # Can be placed over directly (ie. grass)
+        self.unbreakable = np.zeros(count, dtype=bool)
+        self.unpickblockable = np.zeros(count, dtype=bool)
+        self.next_layer = np.zeros(count, dtype=np.uint16) # The block it turns into when broken, 0 if it just breaks
+        self.collision_box = np.zeros(count, dtype=np.uint8) # Index into COLLISION_BOXES
+        # What happens when a structure places a block over another one, indexed by [obstruction, incoming id, existing id],
+        # (see overwrite_action) and the block it turns into instead when the action is CHANGE, indexed by [incoming id, existing id]
+        self.overwrite_actions = np.full((2, count, count), OVERWRITE, dtype=np.uint8)
+        self.overwrite_changes = np.zeros((count, count), dtype=np.uint16)
+
+        for name, data in block_data.items():
+            id = self.ids[name]
+            self.solid[id] = data["collision_box"] == "full"
+            self.replaceable[id] = data.get("replaceable", False)
+            self.unbreakable[id] = data.get("unbreakable", False)
+            self.unpickblockable[id] = data.get("unpickblockable", False)
+            self.next_layer[id] = self.ids[data["next_layer"]] if "next_layer" in data else 0
+            self.collision_box[id] = COLLISION_BOXES.index(data["collision_box"])
+            for existing_id, existing in enumerate(self.names):
+                for obstruction in (False, True):
+                    self.overwrite_actions[int(obstruction), id, existing_id] = overwrite_action(data, existing, obstruction)
+            for existing, changed in data.get("overwrite_and_change", {}).items():
+                self.overwrite_changes[id, self.ids[existing]] = self.ids[changed]
+
+# The actions of a structure block on the block it is placed over
+OVERWRITE = 1 # The block is placed
+OBSTRUCTED = 2 # The whole structure is cancelled
+SKIP = 3 # Only this block isn't placed
+CHANGE = 4 # A different block is placed instead (see "overwrite_and_change")
+
+def overwrite_action(data: dict, existing: str, obstruction: bool) -> int:
+    """Decides what happens when a structure places a block over an existing one, from the overwrite rules in the block data
+
+    Args:
+        data (dict): The block data of the block that the structure places
+        existing (str): The name of the block that is already there, "" for air
+        obstruction (bool): Whether the whole structure is cancelled when one of its blocks can't be placed
+
+    Returns:
+        int: OVERWRITE, OBSTRUCTED, SKIP or CHANGE
+    """
+
+    if existing:
+        # Overwriteable means which blocks the block can replace, and can only overwrite is the same but it also cannot replace air
+        if "overwriteable" in data or "can_only_overwrite" in data:
+            allowed = data["overwriteable"] if "overwriteable" in data else data["can_only_overwrite"]
+            action = OVERWRITE if existing in allowed else OBSTRUCTED if obstruction else SKIP
+        else:
+            action = OBSTRUCTED if obstruction else OVERWRITE
+        if existing in data.get("overwrite_and_change", {}):
+            action = CHANGE
+    # If the block does not exist (air), and the block can't overwrite air
+    elif "can_only_overwrite" in data:
+        action = SKIP
+    else:
+        action = OVERWRITE
+
+    return action
+
+COLLISION_BOXES = ["none", "full"]
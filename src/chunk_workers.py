@@ -0,0 +1,193 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+from concurrent.futures import ProcessPoolExecutor, Future
+from multiprocessing import shared_memory, get_context
+import numpy as np
+import signal
+import os
+
+# Nothing from src is imported at the top of this module, because the worker processes import it before
+# they know the seed of the game, the world generation modules are imported in init_worker instead
+
+class ChunkWorkers:
+    """Generates the terrain of chunks in a pool of worker processes so that chunk loading doesn't stall the main thread
+
+    The results are written by the workers straight into a shared memory buffer, which is split into slots of one chunk each.
+    The workers can also run the Cellular Automata of the blobs of the chunks around the screen ahead of time (see
+    prefetch_blobs), the blob grids are written into a second shared buffer with one slot per worker.
+    """
+
+    def __init__(self, workers: int, slots: int, seed: int, chunk_size: int, blob_shape: tuple[int, int, int] | None = None) -> None:
+        """
+        Args:
+            workers (int): The number of worker processes
+            slots (int): The maximum number of chunks that can be requested at once
+            seed (int): The seed of the world, passed to the workers
+            chunk_size (int): The width and height of a chunk in blocks
+            blob_shape (tuple[int, int, int] | None, optional): The shape of the blob grids of one chunk (see BLOB_SLOT_SHAPE),
+                                                                blobs can only be prefetched when it is given. Defaults to None.
+        """
+
+        self.buffer = shared_memory.SharedMemory(create=True, size=slots * chunk_size * chunk_size * np.dtype(np.uint16).itemsize)
+        self.terrain = np.ndarray((slots, chunk_size, chunk_size), dtype=np.uint16, buffer=self.buffer.buf)
+        self.free_slots = list(range(slots))
+        self.pending: dict[tuple[int, int], tuple[int, Future]] = {} # Chunk position: (slot, future)
+        self.cancelled: list[tuple[int, Future]] = [] # Requests that were already running when they got cancelled
+
+        # At most one blob request per worker runs at once, so that the terrain requests don't wait behind a queue of them
+        blob_slots = workers if blob_shape else 0
+        self.blob_buffer = shared_memory.SharedMemory(create=True, size=max(1, blob_slots * int(np.prod(blob_shape or 0))))
+        self.blobs = np.ndarray((blob_slots, *(blob_shape or (0, 0, 0))), dtype=np.bool_, buffer=self.blob_buffer.buf)
+        self.free_blob_slots = list(range(blob_slots))
+        self.blob_requests: dict[tuple[int, int], tuple[int, Future]] = {} # Chunk position: (slot, future)
+        self.cancelled_blobs: list[tuple[int, Future]] = []
+        self.prefetched_blobs: set[tuple[int, int]] = set() # The chunks whose blobs have been handed back by finished_blobs
+
+        # Spawn instead of fork so that the workers don't inherit the window and the state of the main process
+        self.executor = ProcessPoolExecutor(workers, mp_context=get_context("spawn"), initializer=init_worker,
+                                            initargs=(seed, self.buffer.name, self.terrain.shape, self.blob_buffer.name, self.blobs.shape))
+
+    def request(self, chunk: tuple[int, int]) -> bool:
+        """Start generating the given chunk in the background
+
+        Returns:
+            bool: False if all the slots are taken and the chunk has to be requested again later
+        """
+
+        if chunk in self.pending:
+            return True
+        if not self.free_slots:
+            return False
+
+        slot = self.free_slots.pop()
+        self.pending[chunk] = (slot, self.executor.submit(generate_chunk, chunk, slot))
+        return True
+
+    def cancel(self, chunk: tuple[int, int]) -> None:
+        """Stop the generation of the given chunk, its slot is freed once the worker is done with it"""
+
+        if chunk not in self.pending:
+            return
+        slot, future = self.pending.pop(chunk)
+        if future.cancel():
+            self.free_slots.append(slot)
+        else:
+            self.cancelled.append((slot, future))
+
+    def finished(self) -> list[tuple[tuple[int, int], np.ndarray]]:
+        """Collect the chunks that are done generating
+
+        Returns:
+            list: A list of (chunk position, terrain) pairs, the terrain arrays are copied out of the shared memory
+        """
+
+        for slot, future in self.cancelled.copy():
+            if future.done():
+                self.cancelled.remove((slot, future))
+                self.free_slots.append(slot)
+
+        chunks = []
+        for chunk, (slot, future) in self.pending.copy().items():
+            if future.done():
+                del self.pending[chunk]
+                future.result() # Re-raise any exception from the worker
+                chunks.append((chunk, self.terrain[slot].copy()))
+                self.free_slots.append(slot)
+
+        return chunks
+
+    def prefetch_blobs(self, chunk: tuple[int, int]) -> bool:
+        """Start running the Cellular Automata of the blobs that start in the given chunk in the background
+
+        Returns:
+            bool: False if all the blob slots are taken and the chunk has to be prefetched again later
+        """
+
+        if chunk in self.blob_requests or chunk in self.prefetched_blobs:
+            return True
+        if not self.free_blob_slots:
+            return False
+
+        slot = self.free_blob_slots.pop()
+        self.blob_requests[chunk] = (slot, self.executor.submit(generate_chunk_blobs, chunk, slot))
+        return True
+
+    def cancel_blobs(self, chunk: tuple[int, int]) -> None:
+        """Stop the prefetching of the blobs of the given chunk, its slot is freed once the worker is done with it"""
+
+        if chunk not in self.blob_requests:
+            return
+        slot, future = self.blob_requests.pop(chunk)
+        if future.cancel():
+            self.free_blob_slots.append(slot)
+        else:
+            self.cancelled_blobs.append((slot, future))
+
+    def finished_blobs(self) -> list[tuple[tuple[int, int], np.ndarray]]:
+        """Collect the chunks whose blobs are done
+
+        Returns:
+            list: A list of (chunk position, blob grids) pairs, the grids are copied out of the shared memory (see cache_blobs)
+        """
+
+        for slot, future in self.cancelled_blobs.copy():
+            if future.done():
+                self.cancelled_blobs.remove((slot, future))
+                self.free_blob_slots.append(slot)
+
+        chunks = []
+        for chunk, (slot, future) in self.blob_requests.copy().items():
+            if future.done():
+                del self.blob_requests[chunk]
+                future.result() # Re-raise any exception from the worker
+                chunks.append((chunk, self.blobs[slot].copy()))
+                self.free_blob_slots.append(slot)
+                self.prefetched_blobs.add(chunk)
+        return chunks
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        del self.terrain, self.blobs # The buffers can't be closed while a numpy array still points into them
+        for buffer in (self.buffer, self.blob_buffer):
+            buffer.close()
+            buffer.unlink()
+
+worker_buffer = None
+worker_terrain = None
+worker_blob_buffer = None
+worker_blobs = None
+worker_generate_terrain = None
+worker_generate_blobs = None
+
+def init_worker(seed: int, buffer_name: str, shape: tuple, blob_buffer_name: str, blob_shape: tuple) -> None:
+    """Runs once in every worker process, imports the world generation with the seed of the game and attaches to the shared buffers"""
+
+    global worker_buffer, worker_terrain, worker_blob_buffer, worker_blobs, worker_generate_terrain, worker_generate_blobs
+
+    os.environ["DMC_SEED"] = str(seed)
+    os.environ["SDL_VIDEODRIVER"] = "dummy" # The workers never draw anything, so don't open a window
+    # Ctrl+C is handled by the main process, which shuts the workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    import src.constants # src.constants has to be imported before src.world_gen because of circular imports
+    from src.world_gen import generate_terrain, generate_blobs
+
+    worker_buffer = shared_memory.SharedMemory(name=buffer_name)
+    worker_terrain = np.ndarray(shape, dtype=np.uint16, buffer=worker_buffer.buf)
+    worker_blob_buffer = shared_memory.SharedMemory(name=blob_buffer_name)
+    worker_blobs = np.ndarray(blob_shape, dtype=np.bool_, buffer=worker_blob_buffer.buf)
+    worker_generate_terrain = generate_terrain
+    worker_generate_blobs = generate_blobs
+
+def generate_chunk(chunk: tuple[int, int], slot: int) -> None:
+    """Runs in a worker process, generates the terrain of the chunk into the given slot of the shared buffer"""
+    worker_terrain[slot] = worker_generate_terrain([chunk])[0]
+
+def generate_chunk_blobs(chunk: tuple[int, int], slot: int) -> None:
+    """Runs in a worker process, runs the Cellular Automata of the blobs that start in the chunk into the given slot of the blob buffer"""
+    worker_generate_blobs(*chunk, worker_blobs[slot])
@@ -10,8 +10,10 @@ from pygame.math import Vector2
 from pygame import USEREVENT
 from enum import Enum, auto
 from random import randint
+from os import environ
 
 from src.parsing import load_block_data, load_ore_distribution, load_structures
+from src.block_registry import BlockRegistry
 import dist.exe_comp as exe
 
 init()
@@ -25,12 +27,45 @@ TERMINAL_VEL = 24
 MIN_BLOCK_SIZE = 16
 BLOCK_SIZE = 64
 CHUNK_SIZE = 8
-CAVE_PREGEN_BATCH = 4
+# The cave noise map is cached in tiles of CAVE_TILE_SIZE by CAVE_TILE_SIZE blocks, tiles further than CAVE_TILE_KEEP_DISTANCE
+# tiles from the camera are evicted, and up to CAVE_TILE_PREFETCH_BATCH tiles per frame are generated ahead of the camera
+CAVE_TILE_SIZE = 32
+CAVE_TILE_KEEP_DISTANCE = 4
+CAVE_TILE_PREFETCH = 2
+CAVE_TILE_PREFETCH_BATCH = 2
+# Draws the world at MIN_BLOCK_SIZE on one small framebuffer that is scaled up to the window once per frame, instead of
+# keeping every chunk's image scaled up to BLOCK_SIZE, the player, particles and HUD are still drawn at full resolution
+LOW_RES_RENDERING = False
+# Number of worker processes that generate chunks in the background, 0 generates them on the main thread
+CHUNK_WORKERS = 0
+# The workers run the Cellular Automata of the blobs of the chunks up to BLOB_PREFETCH_DISTANCE chunks beyond the ones that
+# need their structures placed, so that the blobs are usually done by the time the camera gets there
+BLOB_PREFETCH_DISTANCE = 2
+# World generation caches are split into regions of CACHE_REGION_SIZE by CACHE_REGION_SIZE chunks,
+# once a cache has more regions than its limit the least recently used region is evicted
+CACHE_REGION_SIZE = 4
+# Saved chunks are grouped into region files of REGION_SIZE by REGION_SIZE chunks, the chunks that changed are saved every AUTOSAVE_INTERVAL seconds
+REGION_SIZE = 32
+AUTOSAVE_INTERVAL = 30
+# Pre-generating chunks (python main.py pregen) saves its progress every PREGEN_CHECKPOINT_INTERVAL seconds, so that a stopped run can resume
+PREGEN_CHECKPOINT_INTERVAL = 10
+# Block edits are written to a journal right away, and the journal is synced to the disk every JOURNAL_SYNC_INTERVAL seconds
+JOURNAL_SYNC_INTERVAL = 0.5
+# The images of chunks that left the screen are kept for when they come back, up to CHUNK_IMAGE_CACHE_BUDGET bytes of them (1 MB each)
+CHUNK_IMAGE_CACHE_BUDGET = 128 * 2 ** 20
+CACHE_MAX_REGIONS = {
+    "generate_block": 256,
+    "heightmap": 256,
+    "chunk_terrain": 256,
+    "CA": 256
+}
 
 # Universal seed for profiling/timing: 50687767
 # Seeds for structure gen testing: -1797233725, -301804449, 1666679850, 1671665804
 # Seed for low world gen (loads at 1056) testing: 1561761502
-SEED = randint(-2147483648, 2147483647)
+# The seed can be set with main.py --seed or the DMC_SEED environment variable, the chunk worker processes get the seed of
+# the game this way
+SEED = int(environ["DMC_SEED"]) if "DMC_SEED" in environ else randint(-2147483648, 2147483647)
 
 FPS = float("inf")
 VEC = Vector2
@@ -38,20 +73,25 @@ VEC = Vector2
 REGULAR_FONT_LOC = exe.pathof("assets/fonts/regular.ttf")
 PROFILE_DIR = exe.pathof("build/profiles/")
 SCREENSHOTS_DIR = exe.pathof("screenshots/")
+SAVES_DIR = exe.pathof("saves/")
 FONT24 = Font(REGULAR_FONT_LOC, 24)
 FONT20 = Font(REGULAR_FONT_LOC, 20)
 FONT10 = Font(REGULAR_FONT_LOC, 10)
 
 BLOCK_DATA = load_block_data()
-STRUCTURES = load_structures()
-ORE_DISTRIBUTION = load_ore_distribution()
+# Integer ids for every block and numpy arrays of their properties indexed by id, 0 is air
+BLOCKS = BlockRegistry(BLOCK_DATA)
+BLOCK_NAMES = BLOCKS.names
+BLOCK_IDS = BLOCKS.ids
+STRUCTURES = load_structures(BLOCK_IDS)
+# The ores and blobs that generate in each chunk row, as (structure name, attempts per chunk, chance) in the order they are placed
+ORE_DISTRIBUTION = load_ore_distribution(range(MAX_Y // CHUNK_SIZE + 1))
 
 CONFLICTING_STRUCTURES = {
     ("oak_tree", ): ["tall_grass"],
     ("granite", "diorite", "andesite"): ["coal_ore", "iron_ore", "lapis_ore", "gold_ore", "redstone_ore", "diamond_ore", "emerald_ore"],
     ("tuff", ): ["deepslate_coal_ore", "deepslate_iron_ore", "deepslate_lapis_ore", "deepslate_gold_ore", "deepslate_redstone_ore", "deepslate_diamond_ore", "deepslate_emerald_ore"]
 }
-MAX_STRUCTURE_SIZE = (2, 2)
 
 # We dont need this yet but if we ever need custom events I realised we could do something like this :P
 class CustomEvents(Enum):
@@ -20,14 +20,18 @@ from pygame.locals import  (
     QUIT, WINDOWMOVED
 )
 
-from src.constants import SCREENSHOTS_DIR, SEED, WIDTH, HEIGHT, FPS, SCR_DIM, VEC, CHUNK_SIZE, BLOCK_SIZE, SPACING, Anchors, CustomEvents
-from src.world_gen import Chunk, Block, load_chunks
+from src.constants import SCREENSHOTS_DIR, SAVES_DIR, AUTOSAVE_INTERVAL, SEED, WIDTH, HEIGHT, FPS, SCR_DIM, VEC, CHUNK_SIZE, BLOCK_SIZE, SPACING, CHUNK_WORKERS, LOW_RES_RENDERING, Anchors, CustomEvents
+from src.world_gen import Chunk, Block, WorldFramebuffer, load_chunks, save_chunks, cave_tiles, chunk_pipeline, BLOB_SLOT_SHAPE
 from src.sprite import LayersEnum, SPRITE_MANAGER
 from src.utils import bps, inttup, text, CyclicalList
 from src.background import Background
 from src.images import window_icon
 from src.particle import Particle
 from src.information_labels import GenericTextBox, InformationLabel
+from src.chunk_workers import ChunkWorkers
+from src.region_file import WorldStorage
+from src.block_journal import BlockJournal
+from src.gen_cache import RegionCache
 from src.player import Player
 
 import src.utils as utils # For doing utils.do_profile ¯\_(ツ)_/¯
@@ -87,6 +91,17 @@ class Game():
         self.background = Background()
         self.clock = pygame.time.Clock()
         self.rendered_chunks = []
+        self.framebuffer = WorldFramebuffer() if LOW_RES_RENDERING else None
+        # Enough slots for the terrain of every rendered chunk to be generating at once
+        chunk_slots = (WIDTH // (CHUNK_SIZE * BLOCK_SIZE) + 2) * (HEIGHT // (CHUNK_SIZE * BLOCK_SIZE) + 2)
+        self.chunk_workers = ChunkWorkers(CHUNK_WORKERS, chunk_slots, SEED, CHUNK_SIZE, BLOB_SLOT_SHAPE) if CHUNK_WORKERS else None
+        # Every seed is its own world, with its own folder of region files that is only created once something is saved. A world
+        # is opened again by starting the game with its seed (see main.py)
+        self.storage = WorldStorage(Path(SAVES_DIR) / str(SEED))
+        # Block edits go to the journal as they happen, and are compacted into the region files when the chunks are saved
+        self.journal = BlockJournal(self.storage.directory / "blocks.journal")
+        Block.journal = self.journal
+        self.last_save = pygame.time.get_ticks()
         self.debug_bool = False
         self.running = True
         self.window_moved = True
@@ -133,13 +148,17 @@ class Game():
                     self.manager.cycle_cinematic()
 
         # Loading chunks
-        self.rendered_chunks = load_chunks(self.player.camera)
+        self.rendered_chunks = load_chunks(self.player.camera, self.chunk_workers, self.storage)
+        # Saving the chunks that changed every once in a while
+        if pygame.time.get_ticks() - self.last_save > AUTOSAVE_INTERVAL * 1000:
+            save_chunks(self.storage, self.journal)
+            self.last_save = pygame.time.get_ticks()
         # Calling relevant update functions.
         SPRITE_MANAGER.update(dt, m_state=mouse_state, blocks=Block.instances, camera=self.player.camera, rendered_chunks=self.rendered_chunks, player_y=self.player.coords.y, mpos=mpos)
 
     def draw(self) -> None:
         # Drawing all sprites!
-        SPRITE_MANAGER.draw(self.screen, self.debug_bool, camera=self.player.camera, rendered_chunks=self.rendered_chunks)
+        SPRITE_MANAGER.draw(self.screen, self.debug_bool, camera=self.player.camera, rendered_chunks=self.rendered_chunks, framebuffer=self.framebuffer)
 
     def debug(self, mpos) -> None:
         if not self.debug_bool: return
@@ -157,7 +176,11 @@ class Game():
             "Block position": inttup((self.player.pos + (mpos - self.player.rect.topleft)) // BLOCK_SIZE),
             "Detecting rects": len(self.player.detecting_blocks),
             "Particles": len(Particle.instances),
-            "Pre-gen cave heightmap": Chunk.cave_pregeneration_pos if Chunk.cave_pregeneration_bool else "Complete"
+            "Chunks generating": len(self.chunk_workers.pending) if self.chunk_workers else "Main thread",
+            "Cave tiles": cave_tiles,
+            "Chunk stages": chunk_pipeline,
+            "Chunk images": Chunk.baked_images,
+            **{f"Cache {name}": cache for name, cache in RegionCache.instances.items()}
         }
 
         # Displaying the debug values.
@@ -183,5 +206,10 @@ class Game():
 
     def quit(self) -> None:
         """Call quit functions & cleanup."""
+        save_chunks(self.storage, self.journal, wait=True)
+        self.journal.close()
+        self.storage.close()
+        if self.chunk_workers:
+            self.chunk_workers.shutdown()
         pygame.quit()
         sysexit()
\ No newline at end of file
@@ -0,0 +1,112 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Hashable
+
+from src.constants import CACHE_REGION_SIZE, CACHE_MAX_REGIONS, CHUNK_SIZE
+
+class RegionCache:
+    """A bounded cache for world generation, where the entries are grouped by the region of the world they are in
+
+    The regions are kept in least recently used order, and once there are more than max_regions of them the least recently
+    used region is evicted with all of its entries at once. Hit, miss and size counters are kept for the debug screen.
+    """
+
+    instances = {}
+
+    def __init__(self, name: str, region_of: Callable[[Hashable], Hashable], max_regions: int | None = None) -> None:
+        """
+        Args:
+            name (str): The name of the cache, shown on the debug screen
+            region_of (Callable): Takes a key and returns the region the key belongs to
+            max_regions (int, optional): The maximum number of regions kept. Defaults to CACHE_MAX_REGIONS[name].
+        """
+
+        self.name = name
+        self.region_of = region_of
+        self.max_regions = max_regions if max_regions is not None else CACHE_MAX_REGIONS[name]
+        self.regions: OrderedDict[Hashable, dict] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        __class__.instances[name] = self
+
+    def __call__(self, func: Callable) -> Callable:
+        """Use the cache as a decorator, like functools.cache but keyed only by the positional arguments"""
+
+        @wraps(func)
+        def wrapper(*args):
+            try:
+                return self[args if len(args) > 1 else args[0]]
+            except KeyError:
+                value = func(*args)
+                self[args if len(args) > 1 else args[0]] = value
+                return value
+
+        wrapper.cache = self
+        return wrapper
+
+    def __getitem__(self, key: Hashable) -> Any:
+        region = self.region_of(key)
+        if region in self.regions and key in (entries := self.regions[region]):
+            self.regions.move_to_end(region)
+            self.hits += 1
+            return entries[key]
+        self.misses += 1
+        raise KeyError(key)
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        region = self.region_of(key)
+        if region not in self.regions:
+            self.regions[region] = {}
+            if len(self.regions) > self.max_regions:
+                self.evict(next(iter(self.regions)))
+        else:
+            self.regions.move_to_end(region)
+        entries = self.regions[region]
+        self.size += key not in entries
+        entries[key] = value
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Checks if a key is cached, without counting as a hit or a miss"""
+        region = self.region_of(key)
+        return region in self.regions and key in self.regions[region]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def evict(self, region: Hashable) -> None:
+        """Removes a whole region from the cache"""
+        if region in self.regions:
+            self.size -= len(self.regions.pop(region))
+
+    def clear(self) -> None:
+        self.regions.clear()
+        self.size = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": self.size, "regions": len(self.regions), "hit_rate": self.hit_rate}
+
+    def __str__(self) -> str:
+        return f"{self.hit_rate:.1%} hits, {self.size} entries in {len(self.regions)}/{self.max_regions} regions"
+
+def block_region(x: int | float, y: int | float = 0) -> tuple[int, int]:
+    """Gets the region of a block position"""
+    return int(x // (CHUNK_SIZE * CACHE_REGION_SIZE)), int(y // (CHUNK_SIZE * CACHE_REGION_SIZE))
+
+def chunk_region(chunk: tuple[int, int]) -> tuple[int, int]:
+    """Gets the region of a chunk position"""
+    return chunk[0] // CACHE_REGION_SIZE, chunk[1] // CACHE_REGION_SIZE
@@ -0,0 +1,77 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+from collections import OrderedDict
+from typing import Hashable
+from pygame import Surface
+
+class ImageCache:
+    """A cache of images that is limited by the memory they take up instead of by how many there are
+
+    There is one image per key, stored with the version of whatever it was drawn from, so an image that is out of date is
+    dropped instead of handed back. The images are kept in least recently used order, and once they take up more than the
+    budget the least recently used ones are evicted. Hit and miss counters are kept for the debug screen.
+    """
+
+    def __init__(self, budget: int) -> None:
+        """
+        Args:
+            budget (int): The maximum number of bytes the pixels of the cached images can take up
+        """
+
+        self.budget = budget
+        self.images: OrderedDict[Hashable, tuple[Hashable, Surface]] = OrderedDict() # Key: (version, image)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def size_of(image: Surface) -> int:
+        """The number of bytes the pixels of an image take up"""
+        return image.get_pitch() * image.get_height()
+
+    def add(self, key: Hashable, version: Hashable, image: Surface) -> None:
+        """Caches an image in place of the one the key had, evicting the least recently used images if it goes over the budget"""
+
+        if key in self.images:
+            self.bytes -= self.size_of(self.images.pop(key)[1])
+        self.images[key] = (version, image)
+        self.bytes += self.size_of(image)
+        while self.bytes > self.budget and self.images:
+            self.bytes -= self.size_of(self.images.popitem(last=False)[1][1])
+
+    def take(self, key: Hashable, version: Hashable) -> Surface | None:
+        """Removes an image from the cache and returns it, the image is handed back with add once it isn't needed anymore
+
+        Returns:
+            Surface | None: The image, or None if it isn't cached or was drawn from another version, which is dropped
+        """
+
+        if (entry := self.images.pop(key, None)) is None:
+            self.misses += 1
+            return None
+        cached_version, image = entry
+        self.bytes -= self.size_of(image)
+        if cached_version != version:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return image
+
+    def clear(self) -> None:
+        self.images.clear()
+        self.bytes = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.images), "bytes": self.bytes, "budget": self.budget, "hit_rate": self.hit_rate}
+
+    def __str__(self) -> str:
+        return f"{self.hit_rate:.1%} hits, {len(self.images)} images, {self.bytes / 2 ** 20:.0f}/{self.budget / 2 ** 20:.0f} MB"
@@ -10,7 +10,7 @@ from pathlib import Path
 import pygame
 import os
 
-from src.constants import VEC, MIN_BLOCK_SIZE
+from src.constants import VEC, MIN_BLOCK_SIZE, BLOCK_SIZE, BLOCK_NAMES
 from build.exe_comp import pathof
 
 os.environ['SDL_VIDEO_WINDOW_POS'] = "%d,%d" % (50, 50)
@@ -58,4 +58,17 @@ for img in os.listdir(pathof("assets/textures/blocks/")):
     BLOCK_TEXTURES[Path(img).stem] = pygame.image.load(os.path.join(pathof("assets/textures/blocks/"), img)).convert()
 for image in BLOCK_TEXTURES:
     BLOCK_TEXTURES[image] = pygame.transform.scale(BLOCK_TEXTURES[image], (MIN_BLOCK_SIZE, MIN_BLOCK_SIZE))
-    BLOCK_TEXTURES[image].set_colorkey((255, 255, 255))
\ No newline at end of file
+    BLOCK_TEXTURES[image].set_colorkey((255, 255, 255))
+
+# Every block texture side by side in one surface so that a whole chunk is drawn with a single Surface.blits call (see
+# Chunk.draw_blocks), BLOCK_ATLAS_RECTS has the area of each block id in the atlas. The transparent white of the textures is
+# black in the atlas, which is the colour key of chunk images, so the blocks are copied straight over without a colour key.
+BLOCK_ATLAS = pygame.Surface((MIN_BLOCK_SIZE * len(BLOCK_NAMES), MIN_BLOCK_SIZE)).convert()
+BLOCK_ATLAS.fill((0, 0, 0))
+BLOCK_ATLAS_RECTS = [pygame.Rect(id * MIN_BLOCK_SIZE, 0, MIN_BLOCK_SIZE, MIN_BLOCK_SIZE) for id in range(len(BLOCK_NAMES))]
+for id, name in enumerate(BLOCK_NAMES):
+    if name in BLOCK_TEXTURES:
+        BLOCK_ATLAS.blit(BLOCK_TEXTURES[name], BLOCK_ATLAS_RECTS[id])
+
+# The block textures at the size they are shown on the screen, to redraw single blocks on chunk images that are already scaled up
+SCALED_BLOCK_TEXTURES = {name: pygame.transform.scale(texture, (BLOCK_SIZE, BLOCK_SIZE)) for name, texture in BLOCK_TEXTURES.items()}
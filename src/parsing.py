@@ -5,9 +5,11 @@
 # The majority of the game assets are properties of Mojang Studios,
 # you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
 
+from itertools import accumulate
 from pathlib import Path
 from os.path import join
 from os import listdir
+import numpy as np
 import json
 
 from dist.exe_comp import pathof
@@ -20,16 +22,86 @@ def load_block_data() -> dict:
 
     return block_data
 
-def load_ore_distribution() -> dict:
-    ore_distribution = {}
+def load_ore_distribution(rows: range) -> dict:
+    """Load the ore and blob distribution files into a table of what generates in each chunk row.
+
+    The ores come from data/ore_distribution/ (the structure of "coal.json" is "coal_ore"), and the blobs of stone variants
+    from data/blob_distribution.json, which places them after the ores. The order matters, since a structure can only
+    overwrite the blocks it is allowed to, including the blocks of the structures placed before it.
+
+    Args:
+        rows (range): The chunk rows to build the table for
+
+    Returns:
+        dict: {chunk row: [(structure name, attempts per chunk, chance of each attempt out of 100), ...]}
+    """
+
+    distributions = []
     for file in listdir(pathof("data/ore_distribution/")):
-        ore_distribution[Path(file).stem] = json.loads(open(pathof(join("data/ore_distribution/", file)), "r").read())
-    
-    return ore_distribution
+        distribution = json.loads(open(pathof(join("data/ore_distribution/", file)), "r").read())
+        distributions.append((Path(file).stem + "_ore", distribution))
+    for distribution in json.loads(open(pathof("data/blob_distribution.json"), "r").read()):
+        distributions.append((distribution["structure"], distribution))
+
+    table = {row: [] for row in rows}
+    for name, distribution in distributions:
+        for row in rows:
+            # Only the first section that the row is in counts
+            for section in distribution["sections"]:
+                upper, lower = section["range"]
+                if upper <= row < lower:
+                    # The chance goes up or down linearly from 0 to the rarity over the range when it has a slope
+                    slope, rarity = section["slope"], section["rarity"]
+                    chance = (((row - upper) if slope == 1 else (lower - row)) / (lower - upper) * rarity) if slope else rarity
+                    table[row].append((name, distribution["attempts_per_chunk"], chance))
+                    break
+
+    return table
+
+class StructureTemplate:
+    """A structure file compiled into arrays, so that placing the structure doesn't have to parse anything
+
+    The blocks are kept in the order of the file. Blocks with a weighted choice in the legend (ie. "oak_leaves=50,leafed_oak_log=50")
+    have id 0 in ids, and are filled in from their table in choices when the structure is placed.
+    """
 
-def load_structures() -> dict:
+    def __init__(self, origin: tuple[int, int], blocks: dict, block_ids: dict) -> None:
+        """
+        Args:
+            origin (tuple[int, int]): The origin of the structure in the file
+            blocks (dict): {offset from the origin: legend entry} of every block of the structure
+            block_ids (dict): {block name: block id} (see BlockRegistry)
+        """
+
+        self.origin = origin
+        self.blocks = blocks
+        self.offsets = np.array(list(blocks), dtype=int).reshape(-1, 2)
+        # The offsets of both variants, indexed by the mirror roll of StructureGenerator.generate (which flips the x when it is False)
+        self.variants = (self.offsets * (-1, 1), self.offsets)
+        # (min x, min y, max x, max y) of the offsets of each variant
+        self.bboxes = tuple((*variant.min(axis=0).tolist(), *variant.max(axis=0).tolist()) for variant in self.variants)
+        self.size = (self.bboxes[1][2] - self.bboxes[1][0] + 1, self.bboxes[1][3] - self.bboxes[1][1] + 1)
+
+        self.ids = np.zeros(len(blocks), dtype=np.uint16)
+        # (indices of the blocks, ids to choose from, cumulative weights of the ids), one for each weighted choice in the legend
+        self.choices: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        weighted = {}
+        for index, block in enumerate(blocks.values()):
+            if "," in block:
+                weighted.setdefault(block, []).append(index)
+            else:
+                self.ids[index] = block_ids[block]
+        for block, indices in weighted.items():
+            names, weights = zip(*(choice.split("=") for choice in block.split(",")))
+            self.choices.append((np.array(indices), np.array([block_ids[name] for name in names], dtype=np.uint16),
+                                 np.array(list(accumulate(int(weight) for weight in weights)))))
+
+def load_structures(block_ids: dict) -> dict:
     """Load the structure data files into a dictionary.
 
+    Args:
+        block_ids (dict): {block name: block id}, to compile the structures with
+
     Returns:
         dict: A dictionary containing structure information
     """
@@ -117,11 +189,12 @@ def load_structures() -> dict:
 
                 # Path(struct).stem gets the stem of the file (short_oak_tree.structure -> shoroak_tree)
                 # This might be:
-                # structures["oak_tree"][short_oak_tree] = ((2, 4), {
+                # structures["oak_tree"][short_oak_tree] = StructureTemplate((2, 4), {
                 #     (0, 4): "oak_leaves",
                 #     ect.
                 # })
-                structures[folder][Path(struct).stem] = (origin, blocks)
+                # The template also compiles the blocks into arrays (see StructureTemplate)
+                structures[folder][Path(struct).stem] = StructureTemplate(origin, blocks, block_ids)
 
             else: # This block of code handles distribution.structure specifically
                 # Example distribution.structure
@@ -153,12 +226,14 @@ def load_structures() -> dict:
                 # [regular_oak_tree, medium_oak_tree, short_oak_tree, large_oak_tree, balloon_oak_tree]
                 files = [line[:-2].split(' ')[0] for line in distribution]
 
-                # We then add this to the structures dictionary. ex.
+                # We then add this to the structures dictionary, along with the running totals of the weights
+                # so that picking a file is a single bisect. ex.
                 # structures[oak_tree][distribution] = {
                 #    "weights": [57, 18, 10, 8, 7],
+                #    "cum_weights": [57, 75, 85, 93, 100],
                 #    "files": [regular_oak_tree, medium_oak_tree, short_oak_tree, large_oak_tree, balloon_oak_tree],
                 # }
-                structures[folder]["distribution"] = {"weights": weights, "files": files}
+                structures[folder]["distribution"] = {"weights": weights, "cum_weights": list(accumulate(weights)), "files": files}
 
     # We then return the final structures dictionary.
     return structures
\ No newline at end of file
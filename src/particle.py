@@ -15,7 +15,7 @@ import pygame
 import time
 
 from src.sprite import LayerNotFoundException, LayersEnum, Sprite, SpriteNotFoundException
-from src.constants import MIN_BLOCK_SIZE, VEC, BLOCK_SIZE, GRAVITY, WIDTH, HEIGHT, MAX_Y
+from src.constants import MIN_BLOCK_SIZE, VEC, BLOCK_SIZE, GRAVITY, WIDTH, HEIGHT, MAX_Y, BLOCKS
 from src.utils import pps, inttup, sign
 
 if TYPE_CHECKING:
@@ -23,11 +23,11 @@ if TYPE_CHECKING:
 
 class Particle(Sprite):
     """A Common superclass for all particles"""
-    instances = [] # List containing every particle, regardless of type
+    instances = {} # Every particle, regardless of type, as the keys of a dict so that removing one is O(1)
 
     def __init__(self, pos: tuple, vel: tuple, survive_time: float, image: Surface, layer: LayersEnum, master=None) -> None:
         super().__init__(layer)
-        __class__.instances.append(self)
+        __class__.instances[self] = None
         self.world_pos = VEC(pos)
         self.pos = VEC(0, 0)
         self.vel = pps(VEC(vel))
@@ -58,11 +58,7 @@ class Particle(Sprite):
         except (SpriteNotFoundException, LayerNotFoundException):
             pass
 
-        try:
-            __class__.instances.remove(self)
-            del self
-        except ValueError:
-            pass
+        __class__.instances.pop(self, None)
 
 class GradualSpawningParticle:
     timer = time.time()
@@ -93,7 +89,7 @@ class PhysicsParticle(Particle):
         for pos in set([(self.coords.x + sign(self.vel.x), self.coords.y), (self.coords.x, self.coords.y + sign(self.vel.y))]):
             if pos in self.blocks:
                 block = self.blocks[pos]
-                if block.data["collision_box"] != "none":
+                if BLOCKS.solid[block.id]:
                     if self.vel.x != 0:
                         if pygame.Rect(block.pos.x, block.pos.y, BLOCK_SIZE, BLOCK_SIZE).collidepoint(self.world_pos.x + self.vel.x * dt, self.world_pos.y):
                             self.vel.x = 0
@@ -11,7 +11,7 @@ from pygame import K_SPACE, Surface, Rect
 from pygame.math import Vector2
 import pygame
 
-from src.constants import MAX_Y, SCR_DIM, GRAVITY, TERMINAL_VEL, CHUNK_SIZE, BLOCK_SIZE, CHUNK_SIZE
+from src.constants import MAX_Y, SCR_DIM, GRAVITY, TERMINAL_VEL, CHUNK_SIZE, BLOCK_SIZE, CHUNK_SIZE, BLOCKS
 from src.block import Block, BLOCK_DATA, remove_block, is_placeable, updated_set_block, inttup
 from src.particle import BlockParticle, PlayerFallParticle
 from src.utils import block_collide, sign, text, pps
@@ -268,7 +268,7 @@ class Player(Sprite):
                     if (block_pos := (int(self.coords.x - 1 + x), int(self.coords.y - 1 + y))) in blocks: # If there exists a block at that position
                         # Get the block object in that position from the main blocks dictionary
                         block = blocks[block_pos]
-                        if block.data["collision_box"] == "full": # If the block has a full collision box
+                        if BLOCKS.solid[block.id]: # If the block has a full collision box
                             # Here is some code for solving some rounding problems/bugs
                             # Bug description here vvv
                             # https://stackoverflow.com/questions/67419774/falling-left-and-right-inconsistencies-in-pygame-platformer
@@ -311,7 +311,7 @@ class Player(Sprite):
                 for x in range(3):
                     if (int(self.coords.x - 1 + x), int(self.coords.y - 1 + y)) in blocks:
                         block = blocks[(int(self.coords.x - 1 + x), int(self.coords.y - 1 + y))]
-                        if block.data["collision_box"] == "full":
+                        if BLOCKS.solid[block.id]:
                             if self.vel.x < 0:
                                 colliding, detecting_blocks = block_collide(
                                     floor(self.pos.x + self.vel.x * dt / split), floor(self.pos.y),
@@ -355,11 +355,10 @@ class Player(Sprite):
 
         # If the block exists:
         if block_pos in Block.instances:
-            if "unbreakable" in BLOCK_DATA[Block.instances[block_pos].name]: # And the block does not have the unbreakable tag:
-                if BLOCK_DATA[Block.instances[block_pos].name]["unbreakable"]:
-                    return
+            if BLOCKS.unbreakable[Block.instances[block_pos].id]: # And the block does not have the unbreakable tag:
+                return
             # Remove it!
-            remove_block(chunks, block_pos, Block.instances[block_pos].data, neighbors)
+            remove_block(chunks, block_pos, neighbors)
 
     # Please, dear god, never look at this function.
     # We tried it once and we are permanently blinded.
@@ -424,7 +423,7 @@ class Player(Sprite):
         """Pick the block at the mouse position, with all the functionality in 3D Minecraft."""
 
         if block := self.crosshair.block:
-            if "unpickblockable" in BLOCK_DATA[block.name]: return
+            if BLOCKS.unpickblockable[block.id]: return
             old_slot = self.inventory.holding  # Saving the original hotbar item
             if block.name in [item.name for item in self.inventory.items.values()]: # Checking if the desired item is in the inventory
                 # Finding the inventory position of the desired item
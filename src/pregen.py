@@ -0,0 +1,214 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+from collections import deque
+from typing import Iterator
+from pathlib import Path
+import argparse
+import time
+import os
+
+import numpy as np
+
+# Nothing from src is imported at the top of this module, because the seed has to be set before src.constants is imported,
+# the world generation modules are imported in pregenerate instead (the same way as in src.chunk_workers)
+
+def spiral(center: tuple[int, int], radius: int) -> Iterator[tuple[int, int]]:
+    """Lazily goes through the chunks of a square around the center, starting from the center and going outwards one ring at a time"""
+
+    yield center
+    for ring in range(1, radius + 1):
+        x, y = center[0] - ring, center[1] - ring
+        # Along the top of the ring, down its right side, back along the bottom and up its left side
+        for dx, dy in ((1, 0), (0, 1), (-1, 0), (0, -1)):
+            for _ in range(2 * ring):
+                yield x, y
+                x, y = x + dx, y + dy
+
+def area_chunks(area: tuple[int, int, int, int]) -> Iterator[tuple[int, int]]:
+    """The chunks of the area (x0, y0 included, x1, y1 excluded) in spiral order from its middle"""
+
+    x0, y0, x1, y1 = area
+    center = ((x0 + x1 - 1) // 2, (y0 + y1 - 1) // 2)
+    radius = max(center[0] - x0, x1 - 1 - center[0], center[1] - y0, y1 - 1 - center[1])
+    return (chunk for chunk in spiral(center, radius) if x0 <= chunk[0] < x1 and y0 <= chunk[1] < y1)
+
+def format_time(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
+
+class Checkpoint:
+    """How far a pre-generation got, saved in the world's folder so that a run that was stopped can carry on where it left off
+
+    Along with the number of chunks done, it keeps the structure overlay and the status of every chunk (see ChunkStatus), since
+    the chunks that are generated after resuming need them to come out the same as they would have without the interruption.
+    """
+
+    def __init__(self, path: Path, area: tuple[int, int, int, int]) -> None:
+        self.path = path
+        self.area = area
+
+    def load(self) -> int:
+        """Restores the structures of the last checkpoint, and returns how many chunks it had done
+
+        Returns:
+            int: The number of chunks of the spiral that are done, 0 if there is no checkpoint for this area
+        """
+
+        from src.world_gen import Structure, ChunkStatus, chunk_pipeline
+
+        if not self.path.exists():
+            return 0
+        with np.load(self.path) as data:
+            if tuple(data["area"].tolist()) != self.area:
+                print(f"Ignoring the checkpoint of another area {tuple(data['area'].tolist())}")
+                return 0
+            for chunk, overlay in zip(map(tuple, data["overlay_chunks"].tolist()), data["overlay"]):
+                Structure.instances[chunk] = [] # Only whether a chunk has structures is looked up
+                Structure.overlay[chunk] = overlay
+            for x, y, status in data["statuses"].tolist():
+                chunk_pipeline.status[(x, y)] = ChunkStatus(status)
+            return int(data["done"])
+
+    def save(self, done: int) -> None:
+        from src.constants import CHUNK_SIZE
+        from src.world_gen import Structure, chunk_pipeline
+
+        def stack(arrays: dict) -> tuple[np.ndarray, np.ndarray]:
+            return (np.array(list(arrays), dtype=np.int64).reshape(-1, 2),
+                    np.array(list(arrays.values()), dtype=np.int32).reshape(-1, CHUNK_SIZE, CHUNK_SIZE))
+
+        overlay_chunks, overlay = stack(Structure.overlay)
+        statuses = np.array([(*chunk, status) for chunk, status in chunk_pipeline.status.items()], dtype=np.int64).reshape(-1, 3)
+        # Write to a temporary file first so that the checkpoint isn't lost if the run is stopped halfway through
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "wb") as file:
+            np.savez(file, area=np.array(self.area), done=done, overlay_chunks=overlay_chunks, overlay=overlay, statuses=statuses)
+        os.replace(temp_path, self.path)
+
+def pregenerate(seed: int, area: tuple[int, int, int, int], workers: int) -> None:
+    """Generates every chunk of the area and saves it to the world of the seed, so that the game loads it instead
+
+    Args:
+        seed (int): The seed of the world
+        area (tuple): The chunks to generate, (x0, y0) included and (x1, y1) excluded
+        workers (int): The number of processes that generate the terrain, 0 generates it in this process
+    """
+
+    os.environ["DMC_SEED"] = str(seed)
+    os.environ["SDL_VIDEODRIVER"] = "dummy" # Nothing is drawn, so don't open a window
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+    import src.constants # src.constants has to be imported before src.world_gen because of circular imports
+    from src.constants import SAVES_DIR, CHUNK_SIZE, PREGEN_CHECKPOINT_INTERVAL
+    from src.world_gen import Chunk, ChunkStatus, generate_terrain, chunk_pipeline, STRUCTURE_REACH
+    from src.chunk_workers import ChunkWorkers
+    from src.region_file import WorldStorage
+    from src.block import BlockData
+
+    storage = WorldStorage(Path(SAVES_DIR) / str(seed))
+    checkpoint = Checkpoint(storage.directory / "pregen.checkpoint", area)
+    total = (area[2] - area[0]) * (area[3] - area[1])
+    chunks = area_chunks(area)
+
+    done = resumed = checkpoint.load()
+    for _ in range(done):
+        next(chunks)
+    if resumed:
+        print(f"Resuming from chunk {resumed} of {total}")
+
+    unsaved: dict[tuple[int, int], BlockData] = {}
+    start = last_checkpoint = last_print = time.perf_counter()
+
+    def finish(chunk: tuple[int, int], terrain: np.ndarray) -> None:
+        """Generates the structures of a chunk whose terrain is done, in spiral order so that the result doesn't depend on the workers"""
+
+        nonlocal done
+        # Like in load_chunks, every structure that can reach the chunk is placed before it is finalized, so that nothing
+        # spills into it after it is saved
+        chunk_pipeline.advance([(chunk[0] + x, chunk[1] + y) for y in range(-STRUCTURE_REACH[1], STRUCTURE_REACH[1] + 1)
+                                for x in range(-STRUCTURE_REACH[0], STRUCTURE_REACH[0] + 1)], ChunkStatus.BLOBS)
+        # Chunks that were already saved (by the game or a run that was stopped before its checkpoint) are kept as they are
+        if storage.load(chunk) is None:
+            unsaved[chunk] = BlockData(chunk, Chunk.generate(*chunk, terrain))
+        done += 1
+
+    def save() -> None:
+        """Saves the chunks generated since the last save"""
+
+        storage.save(unsaved)
+        unsaved.clear()
+        checkpoint.save(done)
+
+    def progress(end: str = "") -> None:
+        rate = (done - resumed) / max(time.perf_counter() - start, 1e-9)
+        eta = format_time((total - done) / rate) if rate else "?"
+        print(f"\r{done}/{total} chunks ({done / total:.1%}), {rate:.0f} chunks/s, ETA {eta}   ", end=end, flush=True)
+
+    chunk_workers = ChunkWorkers(workers, workers * 16, seed, CHUNK_SIZE) if workers else None
+    try:
+        queue = deque() # The chunks that are being generated, in spiral order
+        terrains = {}
+        while True:
+            if chunk_workers:
+                # Keep the workers busy, and finish the chunks in the order they were requested
+                while chunk_workers.free_slots and (chunk := next(chunks, None)) is not None:
+                    chunk_workers.request(chunk)
+                    queue.append(chunk)
+                if not queue:
+                    break
+                terrains.update(chunk_workers.finished())
+                if queue[0] not in terrains:
+                    time.sleep(0.001)
+                while queue and queue[0] in terrains:
+                    chunk = queue.popleft()
+                    finish(chunk, terrains.pop(chunk))
+            else:
+                # Without workers the terrain is generated here, in batches
+                batch = [chunk for _, chunk in zip(range(64), chunks)]
+                if not batch:
+                    break
+                for chunk, terrain in zip(batch, generate_terrain(batch)):
+                    finish(chunk, terrain)
+
+            now = time.perf_counter()
+            if now - last_checkpoint > PREGEN_CHECKPOINT_INTERVAL:
+                save()
+                last_checkpoint = now
+            if now - last_print > 0.5:
+                progress()
+                last_print = now
+        save()
+        progress(end="\n")
+    except KeyboardInterrupt:
+        # The chunks that are done are saved with the checkpoint, so the next run carries on from here
+        save()
+        progress(end="\n")
+        print("Stopped, run the same command again to resume")
+    finally:
+        if chunk_workers:
+            chunk_workers.shutdown()
+        storage.close()
+
+def main(args: list[str]) -> None:
+    parser = argparse.ArgumentParser(prog="main.py pregen", description="Generate an area of a world ahead of time, so that the game only has to load it")
+    parser.add_argument("--seed", type=int, required=True, help="the seed of the world")
+    area = parser.add_mutually_exclusive_group(required=True)
+    area.add_argument("--radius", type=int, help="generate the square of chunks up to this many chunks away from --center")
+    area.add_argument("--rect", type=int, nargs=4, metavar=("X0", "Y0", "X1", "Y1"), help="generate the chunks from (x0, y0) to (x1, y1), x1 and y1 excluded")
+    parser.add_argument("--center", type=int, nargs=2, default=(0, 0), metavar=("X", "Y"), help="the chunk in the middle of --radius (default: 0 0)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="the number of processes that generate the terrain (default: one per core)")
+    args = parser.parse_args(args)
+
+    if args.radius is not None:
+        area = (args.center[0] - args.radius, args.center[1] - args.radius, args.center[0] + args.radius + 1, args.center[1] + args.radius + 1)
+    else:
+        area = tuple(args.rect)
+    if area[0] >= area[2] or area[1] >= area[3]:
+        parser.error("the area is empty")
+    pregenerate(args.seed, area, args.workers)
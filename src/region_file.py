@@ -0,0 +1,193 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+from threading import Lock
+from pathlib import Path
+import numpy as np
+import struct
+import mmap
+import zlib
+import os
+
+from src.constants import CHUNK_SIZE, REGION_SIZE
+from src.block import BlockData
+
+# Region file format (all numbers are little endian):
+#     magic      4 bytes   b"2DMC"
+#     version    uint16    REGION_VERSION
+#     size       uint16    the width and height of the region in chunks
+#     entries    size * size of (offset uint64, length uint32), one for every chunk of the region in [y, x] order,
+#                an offset of 0 means that the chunk hasn't been saved
+#     payloads   the zlib compressed chunks that the entries point to, one after the other
+# A chunk payload (before compression) is:
+#     palette    uint16 byte length followed by the block names of the chunk's palette separated by "\n"
+#     blocks     CHUNK_SIZE * CHUNK_SIZE uint8 palette indices in [y, x] order
+REGION_MAGIC = b"2DMC"
+REGION_VERSION = 1
+HEADER = struct.Struct("<4sHH")
+PALETTE_LENGTH = struct.Struct("<H")
+ENTRY_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4")])
+
+def encode_chunk(block_data: BlockData) -> bytes:
+    """Turns the block data of a chunk into a compressed payload"""
+    palette = "\n".join(block_data.palette).encode()
+    return zlib.compress(PALETTE_LENGTH.pack(len(palette)) + palette + block_data.blocks.tobytes())
+
+def decode_chunk(chunk: tuple[int, int], payload: bytes) -> BlockData:
+    """Turns a compressed payload back into the block data of the chunk"""
+
+    data = zlib.decompress(payload)
+    palette_length, = PALETTE_LENGTH.unpack_from(data)
+    block_data = BlockData(chunk)
+    block_data.palette = data[PALETTE_LENGTH.size:PALETTE_LENGTH.size + palette_length].decode().split("\n")
+    block_data.palette_ids = {name: id for id, name in enumerate(block_data.palette)}
+    block_data.blocks = np.frombuffer(data, dtype=np.uint8, offset=PALETTE_LENGTH.size + palette_length).reshape(CHUNK_SIZE, CHUNK_SIZE).copy()
+    return block_data
+
+class RegionFile:
+    """One region file, the chunks are read straight out of a memory map of the file"""
+
+    def __init__(self, path: Path, size: int) -> None:
+        self.path = path
+        self.size = size
+        self.data_start = HEADER.size + size * size * ENTRY_DTYPE.itemsize
+        self.map = None
+        self.entries = np.zeros(size * size, dtype=ENTRY_DTYPE)
+        if self.path.exists():
+            self.open()
+
+    def open(self) -> None:
+        """Memory maps the file and reads its header"""
+
+        with open(self.path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = HEADER.unpack_from(self.map)
+        if magic != REGION_MAGIC or version != REGION_VERSION or size != self.size:
+            self.map.close()
+            raise ValueError(f"{self.path} is not a version {REGION_VERSION} region file with {self.size}x{self.size} chunks")
+        self.entries = np.frombuffer(self.map, dtype=ENTRY_DTYPE, count=self.size * self.size, offset=HEADER.size).copy()
+
+    def read(self, index: int) -> bytes | None:
+        """Gets the payload of the chunk at the given index of the region, or None if it hasn't been saved"""
+        offset, length = self.entries[index]
+        if not offset:
+            return None
+        return self.map[offset:offset + length]
+
+    def write(self, payloads: dict[int, bytes]) -> None:
+        """Appends the payloads to the end of the file and points their entries at them
+
+        The old payloads of the chunks are left where they are until the file is compacted. The payloads are on the disk
+        before the header points at them, and the header is on the disk before this returns, since the block journal drops
+        the edits of the chunks once they are saved.
+        """
+
+        self.close()
+        mode = "r+b" if self.path.exists() else "w+b"
+        with open(self.path, mode) as file:
+            if mode == "w+b":
+                file.write(HEADER.pack(REGION_MAGIC, REGION_VERSION, self.size) + self.entries.tobytes())
+            offset = file.seek(0, os.SEEK_END)
+            for index, payload in payloads.items():
+                self.entries[index] = (offset, len(payload))
+                offset += len(payload)
+            file.write(b"".join(payloads.values()))
+            file.flush()
+            os.fsync(file.fileno())
+            file.seek(HEADER.size)
+            file.write(self.entries.tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+
+        # Rewrite the file without the old payloads once they take up more space than the ones in use
+        if (self.path.stat().st_size - self.data_start) > 2 * int(self.entries["length"].sum()):
+            self.compact()
+        self.open()
+
+    def compact(self) -> None:
+        """Rewrites the file with only the payloads that are in use"""
+
+        self.close()
+        with open(self.path, "rb") as file:
+            data = file.read()
+
+        entries = np.zeros_like(self.entries)
+        payloads = []
+        offset = self.data_start
+        for index, (start, length) in enumerate(self.entries):
+            if start:
+                entries[index] = (offset, length)
+                payloads.append(data[start:start + length])
+                offset += length
+
+        # Write to a temporary file first so that the region isn't lost if the game stops halfway through
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "wb") as file:
+            file.write(HEADER.pack(REGION_MAGIC, REGION_VERSION, self.size) + entries.tobytes() + b"".join(payloads))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        self.entries = entries
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+class WorldStorage:
+    """Saves chunks to and loads them from the region files in a world's folder"""
+
+    def __init__(self, directory: str | Path, region_size: int = REGION_SIZE) -> None:
+        """
+        Args:
+            directory (str | Path): The folder of the world, it is created when the first chunk is saved
+            region_size (int, optional): The width and height of a region in chunks. Defaults to REGION_SIZE.
+        """
+
+        self.directory = Path(directory)
+        self.region_size = region_size
+        self.regions: dict[tuple[int, int], RegionFile] = {}
+        self.lock = Lock() # Chunks can be saved in the background while others are being loaded
+
+    def locate(self, chunk: tuple[int, int]) -> tuple[RegionFile, int]:
+        """Gets the region file of a chunk and the index of the chunk in it"""
+
+        region = (chunk[0] // self.region_size, chunk[1] // self.region_size)
+        if region not in self.regions:
+            self.regions[region] = RegionFile(self.directory / f"r.{region[0]}.{region[1]}.region", self.region_size)
+        return self.regions[region], chunk[1] % self.region_size * self.region_size + chunk[0] % self.region_size
+
+    def load(self, chunk: tuple[int, int]) -> BlockData | None:
+        """Loads the block data of a saved chunk, or None if the chunk hasn't been saved"""
+
+        with self.lock:
+            region, index = self.locate(chunk)
+            if region.map is None or (payload := region.read(index)) is None:
+                return None
+        return decode_chunk(chunk, payload)
+
+    def save(self, chunks: dict[tuple[int, int], BlockData]) -> None:
+        """Saves the given chunks, every region file is written to once"""
+
+        # Compress outside of the lock, and only lock one region at a time, so that loading chunks isn't held up for long
+        encoded = {chunk: encode_chunk(block_data) for chunk, block_data in chunks.items()}
+        payloads: dict[RegionFile, dict[int, bytes]] = {}
+        with self.lock:
+            for chunk, payload in encoded.items():
+                region, index = self.locate(chunk)
+                payloads.setdefault(region, {})[index] = payload
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for region, region_payloads in payloads.items():
+            with self.lock:
+                region.write(region_payloads)
+
+    def close(self) -> None:
+        with self.lock:
+            for region in self.regions.values():
+                region.close()
+            self.regions.clear()
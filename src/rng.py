@@ -0,0 +1,91 @@
+# 2DMC is a passion project to recreate the game "Minecraft" (all credit to Mojang Studios) in 2D.
+# Copyright (C) 2022 Doubleface
+# You can view the terms of the GPL License in LICENSE.md
+
+# The majority of the game assets are properties of Mojang Studios,
+# you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
+
+from bisect import bisect
+from itertools import accumulate
+from typing import Any
+import numpy as np
+
+MASK = 0xFFFFFFFFFFFFFFFF # Python ints are unbounded, so everything is masked to 64 bits to match numpy's uint64
+GOLDEN = 0x9E3779B97F4A7C15
+
+def mix(z: int) -> int:
+    """The splitmix64 finalizer, scrambles the bits of a 64 bit integer"""
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK
+    return z ^ (z >> 31)
+
+def mix_array(z: np.ndarray) -> np.ndarray:
+    """Same as mix but for a numpy array of uint64s (uint64 multiplication wraps around on its own)"""
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+def name_hash(name: str) -> int:
+    """Gets a 64 bit FNV-1a hash of a string, used to turn the names of features into feature ids"""
+    value = 0xCBF29CE484222325
+    for byte in name.encode():
+        value = ((value ^ byte) * 0x100000001B3) & MASK
+    return value
+
+def to_uint64(value: int | np.ndarray) -> np.ndarray:
+    """Wraps (possibly negative) integers to uint64 the same way as masking a Python int with MASK"""
+    return np.asarray(value).astype(np.int64).view(np.uint64)
+
+class PositionalRandom:
+    """A stateless random number generator where every number is keyed by (seed, position, feature id, draw)
+
+    The same key always gives the same number no matter which order things are generated in, or which thread or process
+    they are generated on. Every method has a numpy equivalent that gives the exact same numbers for whole arrays of keys.
+    """
+
+    def __init__(self, seed: int) -> None:
+        self.seed = seed & MASK
+
+    def random(self, x: int, y: int, feature: int, draw: int = 0) -> float:
+        """Returns a float in the range [0, 1) for the given key
+
+        Args:
+            x (int): The x position (of a block, a chunk, a structure origin, ect.)
+            y (int): The y position
+            feature (int): The id of the feature the number is for (see name_hash)
+            draw (int, optional): Which number to get if a feature needs more than one at the same position. Defaults to 0.
+        """
+
+        value = mix(self.seed ^ feature)
+        value = mix((value + (x & MASK)) & MASK)
+        value = mix(value ^ (y & MASK))
+        value = mix((value + (draw + 1) * GOLDEN) & MASK)
+        return (value >> 11) * 2 ** -53 # The top 53 bits fill the whole mantissa of a float
+
+    def random_array(self, x: int | np.ndarray, y: int | np.ndarray, feature: int, draw: int | np.ndarray = 0) -> np.ndarray:
+        """Vectorized version of random, x, y and draw can be any arrays that broadcast together"""
+
+        # Wrapping around is the whole point, but numpy warns about it when it happens to numpy scalars
+        with np.errstate(over="ignore"):
+            value = mix_array(np.uint64(self.seed) ^ np.uint64(feature))
+            value = mix_array(value + to_uint64(x))
+            value = mix_array(value ^ to_uint64(y))
+            value = mix_array(value + (to_uint64(draw) + np.uint64(1)) * np.uint64(GOLDEN))
+        return (value >> np.uint64(11)) * 2.0 ** -53
+
+    def rand_bool(self, perc: float, x: int, y: int, feature: int, draw: int = 0) -> bool:
+        """Returns True of False with the probability of the percentage given"""
+        return self.random(x, y, feature, draw) < perc
+
+    def randint(self, a: int, b: int, x: int, y: int, feature: int, draw: int = 0) -> int:
+        """Returns an integer in the range [a, b], including both end points"""
+        return a + int(self.random(x, y, feature, draw) * (b - a + 1))
+
+    def choices(self, population: list, weights: list | None, x: int, y: int, feature: int, draw: int = 0, cum_weights: list | None = None) -> Any:
+        """Returns one element of the population picked with the given weights, works the same way as random.choices
+
+        Like random.choices, the running totals of the weights can be given as cum_weights instead, so they aren't added up every time.
+        """
+        if cum_weights is None:
+            cum_weights = list(accumulate(weights))
+        return population[bisect(cum_weights, self.random(x, y, feature, draw) * cum_weights[-1])]
@@ -9,12 +9,13 @@ from __future__ import annotations
 
 from enum import Enum, auto
 from pygame import Surface
-from typing import Any
+from typing import Any, Iterator
 
 class LayersEnum(Enum):
     BACKGROUND = auto()
     ENV_PARTICLES = auto()
     BLOCKS = auto()
+    WORLD_FRAMEBUFFER = auto()
     REG_PARTICLES = auto()
     BLOCK_SELECTION = auto()
     DEBUG = auto()
@@ -116,51 +117,60 @@ class SpriteNotFoundException(Exception):
         return f"Sprite object {self.sprite} does not exist in the sprite list!"
 
 class SpriteManager:
-    """A class to simplify and better how sprites are drawn and managed"""
+    """A class to simplify and better how sprites are drawn and managed
+
+    The layers are a list indexed by layer value, so they are always in draw order, and the sprites of each layer are the
+    keys of a dict, which works as a set that keeps the order the sprites were added in. Adding, removing and finding a
+    sprite are all O(1). Sprites that are added or removed while the sprites are being updated or drawn are only added or
+    removed once that is done, but the removed ones are skipped straight away.
+    """
 
     def __init__(self, *args: tuple[Sprite]) -> None:
-        self.layers = {}
+        self.layers: list[dict[Sprite, None]] = [{} for _ in range(max(layer.value for layer in LayersEnum) + 1)]
+        # The sprites of debug layers are drawn in their own layers, and only debugged in the debug layer
+        self.debug_layers = [False] * len(self.layers)
+        for layer in LayersEnum:
+            self.debug_layers[layer.value] = layer.name.endswith("_DEBUG")
+        self.iterating = 0 # How many updates or draws are going through the sprites right now
+        self.added: dict[Sprite, None] = {}
+        self.removed: dict[Sprite, None] = {}
         if args: # You can create a spritehandler without specifying any args
             self.add(*args)
 
-    def __iter__(self) -> SpriteManager:
-        # Sorting the layer dict so that the lowest layer (layer that should be drawn first)
-        # is first, and the highest is drawn last
-        self.layers = dict(sorted(self.layers.items()))
-        self.layeriter = self.spriteiter = 0
-        self.get_layer = lambda: list(self.layers.values())[self.layeriter-1]
-        return self
-
-    # Bad code but i just cba at this point this has taken way too long
-    def __next__(self) -> Sprite:
-        # If the current layer is greater than the number of layers, stop the iteration (this exits a for loop)
-        if self.layeriter >= len(self.layers):
-            raise StopIteration
-
-        # The layers dict is keyed by the layer, but we need it to be keyed by its index
-        # Ideally this would be in __iter__ but fsr it crashes so.. ¯\_(ツ)_/¯
-        layer = self.get_layer()
-        self.spriteiter += 1
-        if self.spriteiter >= len(layer): # Then check if it is greater than it's max.
-            self.spriteiter = 0
-
-            # We dont want to return sprites in debug layers, as they would be returned in their respective normal layers so would just cause repetition.
-            # If the next layer is a debug layer, keep on incrementing the layer counter until it is no longer a debug layer
-            # This could benefit from a do / while loop :o (python please add it its actually useful)
-            while True:
-                self.layeriter += 1
-                if not LayersEnum(list(self.layers)[self.layeriter - 1]).name.endswith("_DEBUG"):
-                    layer = self.get_layer() # Recalculating layer with the new layer iteration attribute
-                    break
-
-        return layer[self.spriteiter]
+    def __iter__(self) -> Iterator[Sprite]:
+        """Goes through the sprites from the lowest layer (the layer that is drawn first) to the highest"""
+
+        self.iterating += 1
+        try:
+            for layer, sprites in enumerate(self.layers):
+                # The sprites in debug layers are also in their normal layers, so they would be repeated
+                if self.debug_layers[layer]: continue
+                for sprite in sprites:
+                    if sprite not in self.removed:
+                        yield sprite
+        finally:
+            self.done_iterating()
+
+    def done_iterating(self) -> None:
+        """Applies the changes that were made while going through the sprites, once nothing is going through them anymore"""
+
+        self.iterating -= 1
+        if self.iterating: return
+        for sprite in self.removed:
+            self.layers[sprite._layer].pop(sprite, None)
+            self.layers[sprite._debug_layer].pop(sprite, None)
+        for sprite in self.added:
+            self.layers[sprite._layer][sprite] = None
+            self.layers[sprite._debug_layer][sprite] = None
+        self.removed.clear()
+        self.added.clear()
 
     def __contains__(self, sprite: Sprite) -> bool:
         try:
-            return sprite in self.layers[sprite._layer]
+            return sprite in self.added or (sprite in self.layers[sprite._layer] and sprite not in self.removed)
         except AttributeError: # No layer attribute
             raise NoLayerAttributeException(sprite)
-        except KeyError: # Layer not found
+        except IndexError: # Layer not found
             # We dont want it to throw an error, but may as well have a warning
             print(str(LayerNotFoundException(sprite)))
             return False
@@ -173,51 +183,54 @@ class SpriteManager:
 
         Raises:
             NoLayerAttributeException: If any given sprite does not have a layer attribute
+            LayerNotFoundException: If the layer of any given sprite is not in LayersEnum
         """
 
         for sprite in args:
             try:
-                if sprite._layer != sprite._debug_layer: # If the debug layer is specified (not default)
-                    if sprite._debug_layer not in self.layers: # Make a new debug layer
-                        self.layers[sprite._debug_layer] = [sprite]
-                    else: # Add to an existing debug layer
-                        self.layers[sprite._debug_layer].append(sprite)
-
-                if sprite._layer not in self.layers: # Make a new layer
-                    self.layers[sprite._layer] = [sprite]
-                else: # Add the sprite to a pre-existing layer
-                    self.layers[sprite._layer].append(sprite)
-            # Try / Except is faster
+                if not (0 <= sprite._layer < len(self.layers) and 0 <= sprite._debug_layer < len(self.layers)):
+                    raise LayerNotFoundException(sprite)
+                if self.iterating:
+                    if sprite in self.removed: # Removed and added again in the same update, so it never actually left its layer
+                        del self.removed[sprite]
+                    else:
+                        self.added[sprite] = None
+                else:
+                    # The debug layer is the same as the normal layer if it wasn't specified, then this adds it only once
+                    self.layers[sprite._layer][sprite] = None
+                    self.layers[sprite._debug_layer][sprite] = None
             # Raised if the sprite does not have a layer / debug layer attribute
             except AttributeError:
                 raise NoLayerAttributeException(sprite)
 
     def remove(self, sprite: Sprite) -> None:
-        try: # Remove the sprite
-            self.layers[sprite._layer].remove(sprite)
-            if sprite._layer != sprite._debug_layer:
-                self.layers[sprite._debug_layer].remove(sprite)
-        except ValueError: # If the sprite was not in its corresponding layer list
+        if sprite not in self: # Also raises if the sprite's layer doesn't exist
             raise SpriteNotFoundException(sprite)
-        except KeyError: # If the sprite's layer was not in the layer dict
-            raise LayerNotFoundException(sprite._layer)
-
-        # If the layer list is empty, delete it
-        # (Having an empty list breaks iteration)
-        if not self.layers[sprite._layer]:
-            del self.layers[sprite._layer]
+        if self.iterating:
+            if sprite in self.added: # Added and removed in the same update, so it never has to go in its layer
+                del self.added[sprite]
+            else:
+                self.removed[sprite] = None
+        else:
+            del self.layers[sprite._layer][sprite]
+            self.layers[sprite._debug_layer].pop(sprite, None)
 
     def draw(self, screen: Surface, debug: bool, **kwargs) -> None:
-        # We need to copy self.layers because otheriwse when sprites are created whilst rendering it would crash
-        for layer in (layers := self.layers.copy()): # Loop through every layer
-            for sprite in layers[layer]: # Loop through every sprite
-                if not LayersEnum(layer).name.endswith("_DEBUG"): # Draw every layer that isnt a debug layer
-                    sprite.draw(screen, **kwargs)
-
-                # If we should render debug stuff and the either the layer is a debug layer or the sprite's debug layer is its default layer, debug the sprite
-                if debug:
-                    if LayersEnum(layer).name.endswith("_DEBUG") or sprite._layer == sprite._debug_layer:
-                        sprite.debug(screen, **kwargs)
+        self.iterating += 1
+        try:
+            for layer, sprites in enumerate(self.layers): # Loop through every layer
+                debug_layer = self.debug_layers[layer]
+                for sprite in sprites: # Loop through every sprite
+                    if sprite in self.removed: continue
+                    if not debug_layer: # Draw every layer that isnt a debug layer
+                        sprite.draw(screen, **kwargs)
+
+                    # If we should render debug stuff and the either the layer is a debug layer or the sprite's debug layer is its default layer, debug the sprite
+                    if debug:
+                        if debug_layer or sprite._layer == sprite._debug_layer:
+                            sprite.debug(screen, **kwargs)
+        finally:
+            self.done_iterating()
 
     def update(self, dt: float, **kwargs) -> None:
         for sprite in self:
@@ -7,7 +7,6 @@
 
 from pygame.surface import Surface
 from pygame.math import Vector2
-from random import random
 from pathlib import Path
 from pygame import Rect
 from typing import Any
@@ -128,21 +127,6 @@ def block_collide(playerx: int, playery: int, width: float, height: float, detec
         return True, detecting
     return False, detecting
 
-def canter_pairing(tup: tuple) -> int:
-    """Uses the Canter Pairing function to get a unique integer from a unique interger pair"""
-    # Deal with negative numbers by turning positives into positive evens and negatives into positive odds
-    a = 2 * tup[0] if tup[0] >= 0 else -2 * tup[0] - 1
-    b = 2 * tup[1] if tup[1] >= 0 else -2 * tup[1] - 1
-    return (a + b) * (a + b + 1) + b
-
-def ascii_str_sum(string: str) -> int:
-    """Gets the sum of the ASCII values of all the letters in a string"""
-    return sum([ord(letter) for letter in string])
-
-def rand_bool(perc: float) -> bool:
-    """Returns True of False with the probability of the percentage given"""
-    return random() < perc
-
 def sign(num: int | float) -> int:
     """Returns the sign of the num (+/-) as -1, 0, or 1"""
     return (num > 0) - (num < 0)
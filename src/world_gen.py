@@ -5,71 +5,87 @@
 # The majority of the game assets are properties of Mojang Studios,
 # you can view their TOS here: https://account.mojang.com/documents/minecraft_eula
 
-from random import randint, seed, choices
 from pygame.draw import rect as drawrect
 from opensimplex import OpenSimplex
-from pygame.locals import SRCALPHA
 from pygame.transform import scale
 from pygame import Rect, Surface
-from functools import cache
 from vnoise import Noise
+from time import perf_counter
+from enum import IntEnum
 from os import listdir
 from math import ceil, floor
 import numpy as np
 
-from src.constants import CAVE_PREGEN_BATCH, CHUNK_SIZE, MIN_BLOCK_SIZE, BLOCK_SIZE, ORE_DISTRIBUTION, SEED, VEC, WIDTH, HEIGHT, CONFLICTING_STRUCTURES, MAX_Y, STRUCTURES, BLOCK_DATA, MAX_STRUCTURE_SIZE
+from src.constants import CACHE_REGION_SIZE, CHUNK_IMAGE_CACHE_BUDGET, BLOB_PREFETCH_DISTANCE, LOW_RES_RENDERING, CAVE_TILE_SIZE, CAVE_TILE_KEEP_DISTANCE, CAVE_TILE_PREFETCH, CAVE_TILE_PREFETCH_BATCH, CHUNK_SIZE, MIN_BLOCK_SIZE, BLOCK_SIZE, ORE_DISTRIBUTION, SEED, VEC, WIDTH, HEIGHT, CONFLICTING_STRUCTURES, MAX_Y, STRUCTURES, BLOCK_DATA, BLOCKS, BLOCK_NAMES, BLOCK_IDS
 from src.sprite import SPRITE_MANAGER, Sprite, LayersEnum, SpriteNotFoundException
-from src.utils import ascii_str_sum, canter_pairing, inttup, rand_bool
+from src.rng import PositionalRandom, name_hash
+from src.gen_cache import RegionCache, block_region, chunk_region
+from src.utils import inttup
 from src.block import Block, BlockData, set_block
+from src.block_registry import OBSTRUCTED, SKIP, CHANGE
+from src.chunk_workers import ChunkWorkers
+from src.region_file import WorldStorage
+from src.images import BLOCK_ATLAS, BLOCK_ATLAS_RECTS, SCALED_BLOCK_TEXTURES
+from src.block_journal import BlockJournal
+from src.image_cache import ImageCache
 from src.player import Camera
 from src.block import Block
 
-seed(SEED)
 snoise = OpenSimplex(seed=SEED)
 pnoise = Noise(SEED)
+rng = PositionalRandom(SEED)
+
+# Feature ids that key the random numbers of the different parts of the terrain generation
+# (structure generators have their own, see StructureGenerator.feature)
+BEDROCK_FEATURE = name_hash("bedrock")
+DEEPSLATE_FEATURE = name_hash("deepslate")
+GRASS_FEATURE = name_hash("grass")
+FLOWER_FEATURE = name_hash("flower")
+NO_EDIT = -1 # Marks the blocks of a structure overlay array that aren't covered by a structure
+# The chance (out of 100) of the first block of a blend being chosen at each distance above the blend level
+BLEND_CHANCES = {1: 70, 2: 70, 3: 50, 4: 30}
+# How many pixels on the screen each pixel of a block texture takes up
+PIXEL_SCALE = BLOCK_SIZE // MIN_BLOCK_SIZE
+# Where each block of a chunk is drawn on the chunk's image before it is scaled up, indexed by y * CHUNK_SIZE + x
+TILE_POSITIONS = [(x * MIN_BLOCK_SIZE, y * MIN_BLOCK_SIZE) for y in range(CHUNK_SIZE) for x in range(CHUNK_SIZE)]
 
 class Structure(object):
     instances = {}
+    # Every block of every structure that has been placed, as an array of block ids for each chunk, later structures overwrite earlier ones.
+    # It is the only place the blocks of the structures are kept until they are merged into the terrain of their chunk (see finalize_chunk),
+    # both are dropped for a chunk once no more structures can reach it (see ChunkPipeline.advance)
+    overlay: dict[tuple[int, int], np.ndarray] = {}
 
     def __init__(self, generator, block_data: dict):
         self.generator = generator
         self.block_data = block_data
         self.in_chunks = set([(block_pos[0] // CHUNK_SIZE, block_pos[1] // CHUNK_SIZE) for block_pos in block_data])
-        self.blocks_in_chunk = {}
         for chunk in self.in_chunks:
             if chunk in __class__.instances:
                 __class__.instances[chunk].append(self)
             else:
                 __class__.instances[chunk] = [self]
-            self.blocks_in_chunk[chunk] = {}
+                __class__.overlay[chunk] = np.full((CHUNK_SIZE, CHUNK_SIZE), NO_EDIT, dtype=np.int32)
         for block_pos, block_name in self.block_data.items():
             chunk = (block_pos[0] // CHUNK_SIZE, block_pos[1] // CHUNK_SIZE)
-            self.blocks_in_chunk[chunk][block_pos] = block_name
+            __class__.overlay[chunk][block_pos[1] % CHUNK_SIZE, block_pos[0] % CHUNK_SIZE] = BLOCK_IDS[block_name]
 
 class StructureGenerator(object):
     """Class that handles the generation of structures"""
     def __init__(self, name, obstruction=False):
         self.name = name
+        self.feature = name_hash(name)
         self.on_surface = True
         self.obstruction = obstruction
-        self.files = STRUCTURES[name]
+        self.templates = {file: template for file, template in STRUCTURES[name].items() if file != "distribution"}
         self.distribution = STRUCTURES[name]["distribution"]
-        self.BLOCK_DATA = {}
 
         self.get_max_size()
         self.get_max_chunks()
 
     def get_max_size(self) -> None:
         """Get the maximum dimensions of all the possible variations of this structure"""
-        max_sizes = []
-        for file in self.files:
-            if file != "distribution":
-                self.BLOCK_DATA[file] = STRUCTURES[self.name][file]
-                # Append the max size of all the different possible variations
-                max_sizes.append((max(x for x, y in self.BLOCK_DATA[file][1]) - min(x for x, y in self.BLOCK_DATA[file][1]) + 1,
-                                  max(y for x, y in self.BLOCK_DATA[file][1]) - min(y for x, y in self.BLOCK_DATA[file][1]) + 1))
-        # Get the biggest one
-        self.max_size = max(max_sizes)
+        self.max_size = max(template.size for template in self.templates.values())
 
     def get_max_chunks(self) -> None:
         """Get the maximum number of chunks the structure could span from the max_size"""
@@ -92,108 +108,133 @@ class StructureGenerator(object):
             Structure | None: A Structure object with the resulting block data
         """
 
-        seed(SEED + canter_pairing(origin) + ascii_str_sum(self.name)) # Seeding random-ness
-        file = choices(self.distribution["files"], weights=self.distribution["weights"])[0] # Picking a random file using the files and weights generated in load_STRUCTURES()
-        mirror = rand_bool(0.5) # Bool whether the structure should be flipped or not.
-        block_data = {}
-
-        for offset, block in self.BLOCK_DATA[file][1].items():
-            if mirror: block_pos = (origin[0] + offset[0], origin[1] + offset[1]) # Mirror the structure if mirror is true
-            else: block_pos = (origin[0] - offset[0], origin[1] + offset[1])
-            if "," in block:  # If the block type is a random weighted choice between multiple blocks
-                block_name = choices([i.split("=")[0] for i in block.split(",")],
-                                     weights=[int(i.split("=")[1]) for i in block.split(",")])[0]
-            else:
-                block_name = block
-
-            block_in_chunk = self.get_block_in_chunk(block_pos)
-            match self.can_generate(block_name, block_in_chunk):
-                case 1:
-                    block_data[block_pos] = block_name # Generate the block
-                case 2:
-                    return # Do not generate the entire structure
-                case 3:
-                    continue # Do not generate the block
-                case 4:
-                    block_data[block_pos] = BLOCK_DATA[block_name]["overwrite_and_change"][block_in_chunk]
+        # Picking a random file using the files and weights generated in load_STRUCTURES()
+        file = rng.choices(self.distribution["files"], None, *origin, self.feature, cum_weights=self.distribution["cum_weights"])
+        mirror = rng.rand_bool(0.5, *origin, self.feature, draw=1) # Bool whether the structure should be flipped or not.
+        template = self.templates[file]
 
-        Structure(self, block_data)
-        return block_data
+        # Stamp the (mirrored or not) offsets of the template onto the origin
+        positions = template.variants[mirror] + origin
+        ids = template.ids.copy()
+        for indices, population, cum_weights in template.choices: # The blocks that are a random weighted choice between multiple blocks
+            roll = rng.random_array(positions[indices, 0], positions[indices, 1], self.feature) * cum_weights[-1]
+            ids[indices] = population[np.searchsorted(cum_weights, roll, side="right")]
 
-    def get_block_in_chunk(self, block_pos: tuple) -> str:
-        # real_chunk_pos is the actual chunk position of the current block, not the chunk the structure originates from
-        if (real_chunk_pos := (block_pos[0] // CHUNK_SIZE, block_pos[1] // CHUNK_SIZE)) in Structure.instances:
-            for structure in Structure.instances[real_chunk_pos]:       # Check for structures that have already been pre-generated
-                if block_pos in structure.block_data:                   # If the current block overlaps a block in the structure
-                    block_in_chunk = structure.block_data[block_pos]    # Set the block in chunk to that block in the structure
-                    break
-            else:                                                       # If it did not find a structure that has been pre-generated
-                if block_pos not in Chunk.generated_blocks:             # If the block have not been generated anywhere else
-                    block_in_chunk = generate_block(*block_pos)         # Generate it
-                else:                                                   # If the block has already been generated before
-                    block_in_chunk = Chunk.generated_blocks[block_pos]  # Grab the block
-        else:                                                           # If the structure in a chunk have not been generated
-            if block_pos not in Chunk.generated_blocks:                 # Do what it did above and generate or grab the block
-                block_in_chunk = generate_block(*block_pos)
-            else:
-                block_in_chunk = Chunk.generated_blocks[block_pos]
-
-        return block_in_chunk
+        return self.place(positions, ids)
 
-    def can_generate(self, block_name: str, block_in_chunk: str) -> int:
-        """
+    def place(self, positions: np.ndarray, ids: np.ndarray) -> dict | None:
+        """Checks all the blocks of a structure against the blocks already there at once and places the structure if it can
 
         Args:
-            block_pos (tuple): the position of the block to generate
-            block_name (str): the name of the block to generate
-            chunk_pos (tuple): the position of the chunk that the structure originated from
-            chunk_data (dict): the block data of the chunk that the structure originated from
+            positions (np.ndarray): The world positions of the blocks of the structure, as an array of (x, y)
+            ids (np.ndarray): The ids of the blocks of the structure
 
         Returns:
-            int: (
-                1 means valid generation
-                2 means invalid and the entire structure should not generate
-                3 means invalid and only this specific block should not generate
-                4 means valid but it would change to another block to replace the target block
-            )
+            dict | None: The block data of the structure, or None if it is obstructed
         """
 
-        # Some tests to check if the block can replace the block it's generating on and if not, whether the entire structure can generate
-        if block_in_chunk:
-            # Overwriteable means which blocks the block can replace
-            if "overwriteable" in BLOCK_DATA[block_name]:
-                if block_in_chunk in BLOCK_DATA[block_name]["overwriteable"]:
-                    return_value = 1
-                elif self.obstruction:  # If obstruction is true it means that the entire structure should not generate if one block cannot generate
-                    return_value = 2
-                else:
-                    return_value = 3
-            # Can only overwrite is the same as overwriteable but it also cannot replace air
-            elif "can_only_overwrite" in BLOCK_DATA[block_name]:
-                if block_in_chunk in BLOCK_DATA[block_name]["can_only_overwrite"]:
-                    return_value = 1
-                elif self.obstruction:
-                    return_value = 2
-                else:
-                    return_value = 3
-            elif self.obstruction:
-                return_value = 2
-            else:
-                return_value = 1
-            if "overwrite_and_change" in BLOCK_DATA[block_name]:
-                if block_in_chunk in BLOCK_DATA[block_name]["overwrite_and_change"]:
-                    return_value = 4
-        # If the block does not exist (air), and the block can't overwrite air
-        elif "can_only_overwrite" in BLOCK_DATA[block_name]:
-            return_value = 3
+        existing = self.get_blocks_in_chunk(positions)
+        unknown = np.flatnonzero(existing == NO_EDIT)
+        if self.obstruction:
+            # Only obstruction structures have OBSTRUCTED in their actions, and one such block cancels the whole structure,
+            # so check the blocks that are already known first and then generate the rest one by one until one obstructs it
+            known = existing != NO_EDIT
+            if (BLOCKS.overwrite_actions[1, ids[known], existing[known]] == OBSTRUCTED).any():
+                return
+            for index, (x, y) in zip(unknown.tolist(), positions[unknown].tolist()):
+                existing[index] = BLOCK_IDS[generate_block(x, y)]
+                if BLOCKS.overwrite_actions[1, ids[index], existing[index]] == OBSTRUCTED:
+                    return
         else:
-            return_value = 1
+            existing[unknown] = [BLOCK_IDS[generate_block(x, y)] for x, y in positions[unknown].tolist()]
+
+        actions = BLOCKS.overwrite_actions[int(self.obstruction), ids, existing]
+        ids = np.where(actions == CHANGE, BLOCKS.overwrite_changes[ids, existing], ids)
+
+        placed = actions != SKIP
+        block_data = {block_pos: BLOCK_NAMES[block_id] for block_pos, block_id in zip(map(tuple, positions[placed].tolist()), ids[placed].tolist())}
+        Structure(self, block_data)
+        return block_data
+
+    def get_blocks_in_chunk(self, positions: np.ndarray) -> np.ndarray:
+        """Gets the ids of the blocks at the given positions from the structure overlay or the generated terrain
+
+        Blocks of chunks whose terrain hasn't been generated are left as NO_EDIT, see place.
+        """
+
+        # Structures are small, so going through the blocks one by one is faster than masking the positions of every chunk,
+        # as long as the arrays of each chunk are only looked up once (and turned into lists, which are faster to index)
+        layers = {}
+        blocks = []
+        for x, y in positions.tolist():
+            chunk = (x // CHUNK_SIZE, y // CHUNK_SIZE)
+            if (chunk_layers := layers.get(chunk)) is None:
+                chunk_layers = layers[chunk] = [layer.tolist() for layer in (Structure.overlay.get(chunk), Chunk.generated_terrain.get(chunk))
+                                                if layer is not None]
+            block = NO_EDIT
+            for layer in chunk_layers:
+                if (block := layer[y % CHUNK_SIZE][x % CHUNK_SIZE]) != NO_EDIT:
+                    break
+            blocks.append(block)
+        return np.array(blocks, dtype=np.int32)
+
+def cellular_automata(blobs: np.ndarray, cycles: int) -> np.ndarray:
+    """Runs the Cellular Automata iterations on a batch of blob grids
+
+    A block with 3 or less neighbors disappears and a block with more than 5 neighbors appears. The grid is updated in place
+    one block at a time, line by line, so a block sees the new state of the blocks before it and the old state of the ones
+    after it. The neighbors above the first line and left of the first column wrap around to the other side of the grid,
+    while the ones below the last line and right of the last column don't exist. This is all kept exactly the same as the
+    original loop version so that the blobs of existing seeds don't change.
+
+    Args:
+        blobs (np.ndarray): a bool array of the shape (blobs, height, width), every grid has to be at least 2 by 2
+        cycles (int): how many iterations to go through
+
+    Returns:
+        np.ndarray: the grids after the iterations
+    """
 
-        return return_value
+    blobs = blobs.astype(np.int8)
+    height, width = blobs.shape[1:]
+    columns = np.arange(width)
+    left = (columns - 1) % width # Column to the left of every column, wrapping around
+    right = np.append(columns[1:], width) # Column to the right of every column, the extra zero column means it doesn't exist
+    padded = np.zeros((blobs.shape[0], width + 1), dtype=np.int8)
+
+    def line_sum(line: np.ndarray) -> np.ndarray:
+        """The sum of the left, middle and right block of every column of the lines"""
+        padded[:, :width] = line
+        return padded[:, left] + line + padded[:, right]
+
+    for _ in range(cycles):
+        for y in range(height):
+            line = blobs[:, y]
+            # Every neighbor apart from the one to the left is known before the line is updated
+            neighbors = line_sum(blobs[:, y - 1])
+            if y + 1 < height:
+                neighbors += line_sum(blobs[:, y + 1])
+            padded[:, :width] = line
+            neighbors += padded[:, right]
+            neighbors[:, 0] += line[:, width - 1]
+
+            # The block to the left is either there or not, so work out both outcomes of every block
+            without_left = np.where(neighbors <= 3, 0, np.where(neighbors > 5, 1, line))
+            with_left = np.where(neighbors + 1 <= 3, 0, np.where(neighbors + 1 > 5, 1, line))
+            with_left[:, 0] = without_left[:, 0] # The first block already counted its left neighbor
+            # Where both outcomes are the same the block doesn't depend on its left neighbor, the rest copy it, which
+            # means that every block ends up with the outcome of the last independent block before it
+            independent = np.where(with_left == without_left, columns, 0)
+            blobs[:, y] = np.take_along_axis(without_left, np.maximum.accumulate(independent, axis=1), axis=1)
+
+    return blobs.astype(bool)
 
 class BlobGenerator(StructureGenerator):
+    blobs = RegionCache("CA", lambda key: block_region(*key[1])) # (name, origin): block data of the blob
+
     def __init__(self, name, max_size, density, cycles, obstruction=False):
         self.name = name
+        self.feature = name_hash(name)
         self.on_surface = False
         self.obstruction = obstruction
         self.max_size = max_size
@@ -201,55 +242,39 @@ class BlobGenerator(StructureGenerator):
         self.cycles = cycles
         self.get_max_chunks()
 
-    @cache
-    def CA(self, struct_seed: int, size: tuple, density: int, cycles: int) -> dict:
-        """Function for generating a blob with the Cellular Automata algorithm
+    def CA(self, origins: list[tuple]) -> list[dict]:
+        """Generates a batch of blobs with the Cellular Automata algorithm, all the blobs of the batch go through the CA together
 
         Args:
-            struct_seed (int): the unique seed for this blob, this chunk, this seed
-            size (tuple): size of the grid in which to generate the blob
-            density (int): how dense is the starting grid in the CA (Cellular Automata) algorithm
-            cycles (int): how many CA (Cellular Automata) iterations to go through
+            origins (list[tuple]): the origins of the blobs, which (with the seed and the name of the blob) key their random numbers
 
         Returns:
-            dict: A dict containing the block information of the blob
+            list[dict]: A dict containing the block information of each blob, in the same order as the origins
         """
-        seed(struct_seed)
-
-        is_empty = True
-        while is_empty: # If after the algorithm the array is still empty, redo it
-            blob = np.empty((size[1], size[0])) # Empty numpy array with specified dimensions
-
-            # Populate density/11 of the array
-            for y in range(size[1]):
-                for x in range(size[0]):
-                    blob[y, x] = not rand_bool(density / 11)
-
-            neighbors_offset = [(-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0)]
-
-            for _ in range(cycles):                                   # Number of Cellular Automata iterations
-                for y, line in enumerate(blob):                       # Go through each line
-                    for x, block in enumerate(line):                  # Go through each block
-                        neighbors = 0
-                        for n in neighbors_offset:                    # Check every neighbor around the current block
-                            try:                                      # Try and except for blocks around the edge of the list which lacks neighbors
-                                if blob[y + n[0], x + n[1]]:              # If the neighboring block exists
-                                    neighbors += 1                    # Increment the neighbor counter
-                            except: pass
-                        if neighbors <= 3:                            # If there are less than or equal to 3 neighboring blocks
-                            blob[y, x] = False                        # That block disappears
-                        elif neighbors > 5:                           # If there are more than 5 neighboring blocks
-                            blob[y, x] = True                         # That block appears
-
-            # Turn the list into a dictionary for structure generation
-            blob_dict = {}
-            for y, line in enumerate(blob):
-                for x, block in enumerate(line):
-                    if block:
-                        is_empty = False
-                        blob_dict[(x, y)] = self.name
-
-        return blob_dict
+
+        width, height = self.max_size
+        blobs = {origin: self.blobs.get((self.name, origin)) for origin in origins}
+        missing = [origin for origin, blob in blobs.items() if blob is None]
+        retries = 0
+        while missing: # If after the algorithm a blob is still empty, redo it
+            # Populate density/11 of each grid, every cell of every retry gets its own draw
+            origin_x, origin_y = np.array(missing).T[:, :, None, None]
+            draws = (retries * height + np.arange(height)[:, None]) * width + np.arange(width)
+            grids = rng.random_array(origin_x, origin_y, self.feature, draws) >= self.density / 11
+            retries += 1
+
+            grids = cellular_automata(grids, self.cycles)
+
+            # Turn the grids into dictionaries for structure generation, the empty ones are tried again
+            empty = []
+            for origin, grid in zip(missing, grids):
+                if grid.any():
+                    blobs[origin] = self.blobs[(self.name, origin)] = {(x, y): self.name for y, x in np.argwhere(grid).tolist()}
+                else:
+                    empty.append(origin)
+            missing = empty
+
+        return [blobs[origin] for origin in origins]
 
     def generate(self, origin: tuple) -> dict | None:
         """Generates chunk data that includes a structure at the given origin
@@ -263,76 +288,111 @@ class BlobGenerator(StructureGenerator):
             Structure | None: A Structure object with the resulting block data
         """
 
-        struct_seed = SEED + canter_pairing(origin) + ascii_str_sum(self.name)
         # Create a dictionary of the block data of the blob with Cellular Automata
-        blob = self.CA(struct_seed, self.max_size, self.density, self.cycles)
-
-        block_data = {}
-        for offset, block in blob.items():
-            # Convert the positions to real world position by adding the origin to the block position (offset)
-            block_pos = (origin[0] + offset[0], origin[1] + offset[1])
-            block_in_chunk = self.get_block_in_chunk(block_pos)
-            match self.can_generate(block, block_in_chunk):
-                case 1:
-                    block_data[block_pos] = block # Generate the block
-                case 2:
-                    return # Do not generate the entire structure
-                case 3:
-                    continue # Do not generate the block
-                case 4:
-                    block_data[block_pos] = BLOCK_DATA[block]["overwrite_and_change"][block_in_chunk]
+        blob = self.CA([origin])[0]
 
-        Structure(self, block_data)
-        return block_data
+        # Convert the positions to real world position by adding the origin to the block position (offset)
+        positions = np.array(list(blob), dtype=int).reshape(-1, 2) + origin
+        return self.place(positions, np.full(len(positions), BLOCK_IDS[self.name], dtype=np.uint16))
 
 class Chunk(Sprite):
     """The class responsible for updating and drawing chunks."""
 
-    generated_blocks = {}
+    generated_terrain = RegionCache("chunk_terrain", chunk_region)
+    # The images of chunks that left the screen by chunk position, with the block data version they were drawn from, an image is
+    # only taken back if the chunk comes back unchanged
+    baked_images = ImageCache(CHUNK_IMAGE_CACHE_BUDGET)
     instances = {}
-    cave_pregeneration_pos = [(-(chunks_to_load := (WIDTH // (CHUNK_SIZE * BLOCK_SIZE) + 2 + 2 * MAX_STRUCTURE_SIZE[0], HEIGHT // (CHUNK_SIZE * BLOCK_SIZE) + 2 + 2 * MAX_STRUCTURE_SIZE[1]))[0] // 2 - 1) * CHUNK_SIZE, (-chunks_to_load[1] // 2 - 1) * CHUNK_SIZE]
-    cave_pregeneration_bool = True
 
-    def __init__(self, pos: tuple, layer: LayersEnum = LayersEnum.BLOCKS) -> None:
-        __class__.instances[pos] = self
+    def __init__(self, pos: tuple, layer: LayersEnum = LayersEnum.BLOCKS, terrain: np.ndarray | None = None, block_data: BlockData | None = None) -> None:
         super().__init__(layer)
         self.pos = VEC(pos)
-        self.previous_block_data = {}
-        self.block_data = BlockData(self.generate(pos[0], pos[1]))
+        self.drawn_version = None # The version of the block data that the image was last drawn with
+        # Chunks that were loaded from a save already have their block data, the rest are generated
+        self.from_save = block_data is not None
+        self.block_data = block_data if block_data is not None else BlockData(pos, self.generate(pos[0], pos[1], terrain))
+        # Only added once it has its blocks, the structures placed while it generates don't set blocks in it (see place_structures)
+        __class__.instances[pos] = self
+        # A chunk that was generated stands in for its FINALIZED status from here on (see ChunkPipeline.get)
+        if not self.from_save:
+            chunk_pipeline.status.pop(pos, None)
+        self.saved_version = self.block_data.version # The chunk only needs to be saved once its blocks change
+        # Edits from a session that didn't get to save them are replayed on top, they make the chunk need saving since they
+        # leave the journal at the next compaction
+        if Block.journal:
+            Block.journal.apply(pos, self.block_data)
         self.rect = Rect(0, 0, CHUNK_SIZE * BLOCK_SIZE, CHUNK_SIZE * BLOCK_SIZE)
-        self.image = Surface((MIN_BLOCK_SIZE * CHUNK_SIZE, MIN_BLOCK_SIZE * CHUNK_SIZE), SRCALPHA)
+        self.image = None # Baked the first time the chunk is drawn, then only the blocks that changed are redrawn on it
 
     def update(self, dt: float, **kwargs) -> None:
         if self.pos not in kwargs["rendered_chunks"]: return
 
-        if (block_positions := list(self.block_data.keys())):
-            if block_positions[0] not in Block.instances:
-                for block in self.block_data:
-                    Block.instances[block] = Block(self, block, self.block_data[block])
-
-        for block in self.block_data:
+        for block, name in self.block_data.items():
+            # The blocks of chunks that stopped being rendered are killed, so create them again
+            if block not in Block.instances:
+                Block.instances[block] = Block(self, block, name)
             Block.instances[block].calc_pos(kwargs["camera"])
 
         self.rect.topleft = (self.pos[0] * CHUNK_SIZE * BLOCK_SIZE - kwargs["camera"].pos[0],
                              self.pos[1] * CHUNK_SIZE * BLOCK_SIZE - kwargs["camera"].pos[1],)
 
     def draw(self, screen: Surface, **kwargs) -> None:
-        # Calls the draw function for each of the blocks inside
         if self.pos not in kwargs["rendered_chunks"]: return
 
+        if self.drawn_version != self.block_data.version:
+            if self.drawn_version is None:
+                if not self.block_data: return # Chunks of air have nothing to draw until a block is placed in them
+                if (image := __class__.baked_images.take(inttup(self.pos), self.block_data.version)) is not None:
+                    self.image = image
+                else:
+                    self.bake()
+            else:
+                self.redraw(self.block_data.dirty)
+            self.block_data.dirty.clear()
+            self.drawn_version = self.block_data.version
+
         if self.block_data:
-            if self.previous_block_data != self.block_data:
-                self.image = Surface((MIN_BLOCK_SIZE * CHUNK_SIZE, MIN_BLOCK_SIZE * CHUNK_SIZE)).convert()
-                self.image.set_colorkey((0, 0, 0))
-                for block in self.block_data:
-                    if block not in Block.instances:
-                        Block.instances[block] = Block(self, block, self.block_data[block])
-                    Block.instances[block].draw(self.image, kwargs["camera"])
-                self.image = scale(self.image, (BLOCK_SIZE * CHUNK_SIZE, BLOCK_SIZE * CHUNK_SIZE))
+            if LOW_RES_RENDERING:
+                kwargs["framebuffer"].blit_chunk(self.image, self.pos)
+            else:
+                screen.blit(self.image, self.rect)
+
+    def bake(self) -> None:
+        """Draws every block of the chunk on a new image, which is then scaled up to the size it is shown at
+        (unless LOW_RES_RENDERING is on, then the whole WorldFramebuffer is scaled up instead)"""
 
-            screen.blit(self.image, self.rect)
+        self.image = self.draw_blocks() if LOW_RES_RENDERING else scale(self.draw_blocks(), (BLOCK_SIZE * CHUNK_SIZE, BLOCK_SIZE * CHUNK_SIZE))
+
+    def draw_blocks(self) -> Surface:
+        """Draws the blocks of the chunk at MIN_BLOCK_SIZE in one go, with a single Surface.blits call from the block atlas
+
+        Returns:
+            Surface: The image of the chunk, with black as the colour key
+        """
+
+        image = Surface((MIN_BLOCK_SIZE * CHUNK_SIZE, MIN_BLOCK_SIZE * CHUNK_SIZE)).convert()
+        image.set_colorkey((0, 0, 0))
+        ids = self.block_data.block_ids().ravel()
+        tiles = np.flatnonzero(ids)
+        image.blits([(BLOCK_ATLAS, TILE_POSITIONS[tile], BLOCK_ATLAS_RECTS[id]) for tile, id in zip(tiles.tolist(), ids[tiles].tolist())], doreturn=False)
+        return image
+
+    def redraw(self, dirty: set[tuple[int, int]]) -> None:
+        """Draws only the blocks that changed on the image that is already baked, so breaking a block costs a single blit
+
+        Args:
+            dirty (set[tuple[int, int]]): The [y, x] indices of the blocks in the chunk that changed
+        """
 
-        self.previous_block_data = self.block_data.copy()
+        size = MIN_BLOCK_SIZE if LOW_RES_RENDERING else BLOCK_SIZE
+        for y, x in dirty:
+            tile = Rect(x * size, y * size, size, size)
+            self.image.fill((0, 0, 0), tile) # Clear it to the colour key, which is what air is
+            if (name := self.block_data.palette[self.block_data.blocks[y, x]]):
+                if LOW_RES_RENDERING:
+                    self.image.blit(BLOCK_ATLAS, tile, BLOCK_ATLAS_RECTS[BLOCK_IDS[name]])
+                else:
+                    self.image.blit(SCALED_BLOCK_TEXTURES[name], tile)
 
     def debug(self, screen: Surface, **kwargs) -> None:
         drawrect(screen, (255, 255, 0), self.rect, width=1)
@@ -343,154 +403,271 @@ class Chunk(Sprite):
             if block in Block.instances:
                 Block.instances[block].kill()
 
+        # Hand the image over to the cache, where it only stays while there is room for it
+        if self.image is not None:
+            __class__.baked_images.add(inttup(self.pos), self.drawn_version, self.image)
+            self.image = None
+            self.drawn_version = None
+
         try: # Deleting the chunk from the sprite list.
             SPRITE_MANAGER.remove(self)
         except SpriteNotFoundException:
             pass
 
-    def generate(self, x: int, y: int) -> dict:
-        """Takes the chunk coordinates and returns a dictionary containing the block data inside the chunk"""
+    @classmethod
+    def generate(cls, x: int, y: int, terrain: np.ndarray | None = None) -> dict:
+        """Takes the chunk coordinates and returns a dictionary containing the block data inside the chunk
 
-        chunk_data = {}
-        for y_pos in range(CHUNK_SIZE):
-            for x_pos in range(CHUNK_SIZE):
-                block_pos = (x * CHUNK_SIZE + x_pos, y * CHUNK_SIZE + y_pos)
+        It is a class method so that chunks can be generated without creating the sprite (see src.pregen).
 
-                # Generate each block
-                if block_pos in __class__.generated_blocks:
-                    block_name = __class__.generated_blocks[block_pos]
-                else:
-                    block_name = generate_block(block_pos[0], block_pos[1])
+        Args:
+            x (int): chunk position x
+            y (int): chunk position y
+            terrain (np.ndarray | None, optional): the chunk's terrain if it was already generated in a batch by generate_terrain
 
-                if block_name != "":
-                    chunk_data[block_pos] = block_name
+        Returns:
+            dict: the block data of the chunk
+        """
 
-        # If the structure has already been pre-generated and saved in another chunk, don't generate it again
-        if (x, y) in Structure.instances:
-            for structure in Structure.instances[(x, y)]:
-                for block_pos, block_name in structure.blocks_in_chunk[(x, y)].items():
-                    chunk_data[block_pos] = block_name
-        else:
-            if -1 <= y <= 1: # Surface generations
-                chunk_data = generate_structures(x, y, chunk_data, "oak_tree", 1, chance=33)
-                chunk_data = generate_structures(x, y, chunk_data, "tall_grass", 4, chance=25)
-            for ore, data in ORE_DISTRIBUTION.items():
-                for section in data["sections"]:
-                    if section["range"][0] <= y < section["range"][1]:
-                        chunk_data = generate_structures(x, y, chunk_data, ore + "_ore", data["attempts_per_chunk"], dist=section)
-                        break
-            if MAX_Y // CHUNK_SIZE // 2 > y >= 0: # Everywhere underground above y-512
-                chunk_data = generate_structures(x, y, chunk_data, "granite", 2, chance=14)
-                chunk_data = generate_structures(x, y, chunk_data, "diorite", 2, chance=14)
-                chunk_data = generate_structures(x, y, chunk_data, "andesite", 2, chance=14)
-            elif MAX_Y // CHUNK_SIZE >= y >= MAX_Y // CHUNK_SIZE // 2:
-                chunk_data = generate_structures(x, y, chunk_data, "tuff", 2, chance=20)
+        if terrain is not None:
+            chunk_pipeline.add_terrain((x, y), terrain)
+        # The chunks around it have usually had their structures placed already (see load_chunks), this finishes the stages of
+        # the chunk itself, the blocks of the structures that cover it are merged into its terrain so that get_blocks_in_chunk sees them too
+        chunk_pipeline.advance([(x, y)], ChunkStatus.FINALIZED)
+        terrain = __class__.generated_terrain[(x, y)]
+
+        chunk_data = {}
+        for (y_pos, x_pos), block_id in np.ndenumerate(terrain):
+            if block_id:
+                chunk_data[(x * CHUNK_SIZE + x_pos, y * CHUNK_SIZE + y_pos)] = BLOCK_NAMES[block_id]
 
         return chunk_data
 
-def get_structures(x: int, y: int, generator: StructureGenerator, attempts: int, chance: int | None, dist: dict) -> list:
-    """Get structures inside the current chunk (x, y)
+class ChunkPlaceholder(Sprite):
+    """Drawn in place of a chunk while it is being generated in the background"""
+
+    instances = {}
+
+    def __init__(self, pos: tuple, layer: LayersEnum = LayersEnum.BLOCKS) -> None:
+        __class__.instances[pos] = self
+        super().__init__(layer)
+        self.pos = VEC(pos)
+        self.rect = Rect(0, 0, CHUNK_SIZE * BLOCK_SIZE, CHUNK_SIZE * BLOCK_SIZE)
+
+    def update(self, dt: float, **kwargs) -> None:
+        self.rect.topleft = (self.pos[0] * CHUNK_SIZE * BLOCK_SIZE - kwargs["camera"].pos[0],
+                             self.pos[1] * CHUNK_SIZE * BLOCK_SIZE - kwargs["camera"].pos[1],)
+
+    def draw(self, screen: Surface, **kwargs) -> None:
+        drawrect(screen, (90, 90, 90), self.rect)
+
+    def debug(self, screen: Surface, **kwargs) -> None:
+        drawrect(screen, (255, 0, 0), self.rect, width=1)
+
+    def kill(self) -> None:
+        del __class__.instances[inttup(self.pos)]
+        super().kill()
+
+class WorldFramebuffer(Sprite):
+    """The chunks are drawn on this at MIN_BLOCK_SIZE when LOW_RES_RENDERING is on, and it is scaled up to the screen in one go
+
+    It is in the layer right above the blocks, so the background is drawn on the screen before it and the particles, the
+    player and the HUD after it, at full resolution.
+    """
+
+    def __init__(self, layer: LayersEnum = LayersEnum.WORLD_FRAMEBUFFER) -> None:
+        super().__init__(layer)
+        # One pixel more than the screen needs, since the camera can be partway through a pixel
+        size = (ceil(WIDTH / PIXEL_SCALE) + 1, ceil(HEIGHT / PIXEL_SCALE) + 1)
+        self.image = Surface(size).convert()
+        self.image.set_colorkey((0, 0, 0))
+        # Scaled into the same surface every frame instead of making a new one
+        self.scaled_image = Surface((size[0] * PIXEL_SCALE, size[1] * PIXEL_SCALE)).convert()
+        self.scaled_image.set_colorkey((0, 0, 0))
+        self.origin = (0, 0) # The pixel of the world (at MIN_BLOCK_SIZE) at the top left of the framebuffer
+        self.offset = (0, 0) # Where the scaled up framebuffer goes on the screen
+
+    def update(self, dt: float, **kwargs) -> None:
+        camera = kwargs["camera"].pos
+        self.origin = (int(camera[0] // PIXEL_SCALE), int(camera[1] // PIXEL_SCALE))
+        # Rounded half up like the rects of the sprites that are drawn at full resolution (on the screen), so that they line up
+        self.offset = (floor(self.origin[0] * PIXEL_SCALE - camera[0] + 0.5), floor(self.origin[1] * PIXEL_SCALE - camera[1] + 0.5))
+        self.image.fill((0, 0, 0))
+
+    def blit_chunk(self, image: Surface, chunk: tuple[int, int]) -> None:
+        """Draws the image of a chunk, baked at MIN_BLOCK_SIZE, where the chunk is on the framebuffer"""
+        self.image.blit(image, (chunk[0] * CHUNK_SIZE * MIN_BLOCK_SIZE - self.origin[0], chunk[1] * CHUNK_SIZE * MIN_BLOCK_SIZE - self.origin[1]))
+
+    def draw(self, screen: Surface, **kwargs) -> None:
+        scale(self.image, self.scaled_image.get_size(), self.scaled_image)
+        screen.blit(self.scaled_image, self.offset)
+
+def structure_origins(x: int, y: int, generator: StructureGenerator, attempts: int, chance: float) -> list[tuple[int, int]]:
+    """Get the positions that the structures inside the current chunk (x, y) start from
 
     Args:
         x (int): chunk position x
         y (int): chunk position y
-        chunk_data (dict): dictionary containing the block data of the current chunk
         generator (StructureGenerator): structure generator object to use to generate
         attempts (int): how many times it is going to attempt to generate per chunk
-        chance (int or None): the chance of the structure generating per attempt
-        dist (dict): the distribution dictionary containing: the range of the slope, the maximum rarity, and the direction of the slope
+        chance (float): the chance (out of 100) of the structure generating per attempt
 
     Returns:
-        list: a list containing the block data of each of the structures in the chunk
+        list: the origin of each of the structures in the chunk
     """
 
-    structures = []
-    seed(SEED + canter_pairing((x, y)) + ascii_str_sum(generator.name))
-
-    if chance is None: # Has to be "is None" because chance can also be 0
-        upper = dist["range"][0]
-        lower = dist["range"][1]
-        slope = dist["slope"]
-        rarity = dist["rarity"]
-        chance = (((y - upper) if slope == 1 else (lower - y)) / (lower - upper) * rarity) if slope else rarity
-
-    for _ in range(attempts):
-        if rand_bool(chance / 100):
-            start_x = x * CHUNK_SIZE + randint(0, CHUNK_SIZE - 1)
+    origins = []
+    for attempt in range(attempts):
+        # Each attempt uses 3 draws of the chunk's random numbers
+        if rng.rand_bool(chance / 100, x, y, generator.feature, draw=3 * attempt):
+            start_x = x * CHUNK_SIZE + rng.randint(0, CHUNK_SIZE - 1, x, y, generator.feature, draw=3 * attempt + 1)
             if generator.on_surface:
                 # Generate on the surface of the world
-                start_y = terrain_generate(start_x)[1] - 1
+                height, _, cave_above_surface, cave_at_surface = heightmap.column(start_x)
+                start_y = height - 1
                 # If it is cut off by a cave, don't generate
-                if (92.7 < cave_generate((start_x / 70, start_y / 70)) < 103) or (92.7 < cave_generate((start_x / 70, (start_y + 1) / 70)) < 103):
-                    return structures
+                if cave_above_surface or cave_at_surface:
+                    break
             else:
-                start_y = y * CHUNK_SIZE + randint(0, CHUNK_SIZE)
+                start_y = y * CHUNK_SIZE + rng.randint(0, CHUNK_SIZE, x, y, generator.feature, draw=3 * attempt + 2)
 
             # Structures that are not in this chunk
             if not 0 <= start_y - y * CHUNK_SIZE < CHUNK_SIZE:
-                return structures
+                break
 
-            structure = generator.generate((start_x, start_y))
-            if structure:
-                structures.append(structure)
+            origins.append((start_x, start_y))
 
-    return structures
+    return origins
 
-def generate_structures(x: int, y: int, chunk_data: dict, name: str, attempts: int, chance: int | None = None, dist: dict = {}) -> dict:
-    """Check the surrounding chunks for structures that generates in the current chunk (x, y), and then returns the chunk data with the structure
+def get_structures(x: int, y: int, generator: StructureGenerator, attempts: int, chance: float) -> list:
+    """Get structures inside the current chunk (x, y)
 
     Args:
         x (int): chunk position x
         y (int): chunk position y
-        chunk_data (dict): block data of the current chunk
-        generator (StructureGenerator): the structure generator object to use to generate
+        generator (StructureGenerator): structure generator object to use to generate
         attempts (int): how many times it is going to attempt to generate per chunk
-        chance (int or None, optional): the chance of the structure generating per attempt
-        dist (dict, optional): the distribution dictionary containing: the range of the slope, the maximum rarity, and the direction of the slope
+        chance (float): the chance (out of 100) of the structure generating per attempt
 
     Returns:
-        dict: the chunk data with the structure
+        list: a list containing the block data of each of the structures in the chunk
     """
 
+    structures = []
+
+    origins = structure_origins(x, y, generator, attempts, chance)
+    # Run the Cellular Automata of all the blobs of the chunk in one batch
+    if isinstance(generator, BlobGenerator):
+        generator.CA(origins)
+
+    for origin in origins:
+        structure = generator.generate(origin)
+        if structure:
+            structures.append(structure)
+
+    return structures
+
+def blob_origins(x: int, y: int) -> list[tuple[str, list[tuple[int, int]]]]:
+    """Get the origins of the blobs that start in the chunk (x, y), kind by kind in the order the BLOBS stage places them
+
+    Returns:
+        list: (name of the blob, origins of the blobs of that kind) for every kind of blob of the chunk
+    """
+
+    return [(name, structure_origins(x, y, structure_generators[name], attempts, chance)) for name, attempts, chance in ORE_DISTRIBUTION.get(y, ())
+            if isinstance(structure_generators[name], BlobGenerator)]
+
+def generate_blobs(x: int, y: int, grids: np.ndarray) -> None:
+    """Runs the Cellular Automata of every blob that starts in the chunk (x, y), without placing them
+
+    The chunk workers run it ahead of time for the chunks that are about to get their structures placed, then cache_blobs
+    puts the blobs in BlobGenerator.blobs, so that the BLOBS stage of these chunks doesn't run the Cellular Automata on the
+    main thread.
+
+    Args:
+        x (int): chunk position x
+        y (int): chunk position y
+        grids (np.ndarray): the array of shape BLOB_SLOT_SHAPE that the blobs are written into, indexed by [blob, y, x] in
+                            the order of blob_origins
+    """
+
+    grids[:] = False
+    index = 0
+    for name, origins in blob_origins(x, y):
+        for blob in structure_generators[name].CA(origins):
+            positions = np.array(list(blob), dtype=int).reshape(-1, 2)
+            grids[index, positions[:, 1], positions[:, 0]] = True
+            index += 1
+
+def cache_blobs(x: int, y: int, grids: np.ndarray) -> None:
+    """Puts the blobs that generate_blobs wrote for the chunk (x, y) into BlobGenerator.blobs"""
+
+    index = 0
+    for name, origins in blob_origins(x, y):
+        for origin in origins:
+            BlobGenerator.blobs[(name, origin)] = {(blob_x, blob_y): name for blob_y, blob_x in np.argwhere(grids[index]).tolist()}
+            index += 1
+
+def place_structures(x: int, y: int, name: str, attempts: int, chance: float) -> None:
+    """Places the structures of one kind that start in the chunk (x, y)
+
+    Args:
+        x (int): chunk position x
+        y (int): chunk position y
+        name (str): the name of the structure generator to use to generate
+        attempts (int): how many times it is going to attempt to generate per chunk
+        chance (float): the chance (out of 100) of the structure generating per attempt
+    """
+
+    # Chunks that already have structures (of an earlier kind, or that spilled in from another chunk) don't get any more
+    if (x, y) in Structure.instances:
+        return
+
     generator: StructureGenerator = structure_generators[name]
-    if (x, y) not in Structure.instances:
-        structs = get_structures(x, y, generator, attempts, chance, dist)
-    else:
-        structs = [structure.block_data for structure in Structure.instances[(x, y)]]
-    for struct in structs:
+    for struct in get_structures(x, y, generator, attempts, chance):
         for block_pos, block_name in struct.items():
-            block_chunk = (floor(block_pos[0] / CHUNK_SIZE), floor(block_pos[1] / CHUNK_SIZE))
-            if block_chunk[0] == x and block_chunk[1] == y:
-                chunk_data[block_pos] = block_name
-            else:
-                if block_chunk in Chunk.instances:
-                    set_block(Chunk.instances, block_pos, block_name)
-                else:
-                    Chunk.generated_blocks[block_pos] = block_name
+            # The blocks are in the overlay, so only the chunks that were already made have to be changed. Chunks that were loaded
+            # from a save already have the structures that cover them, and the player may have changed them since
+            if (chunk := Chunk.instances.get((block_pos[0] // CHUNK_SIZE, block_pos[1] // CHUNK_SIZE))) is not None and not chunk.from_save:
+                set_block(Chunk.instances, block_pos, block_name)
+
+def place_surface_structures(x: int, y: int) -> None:
+    """The SURFACE stage: places the trees and tall grass that start in the chunk (x, y)"""
+
+    if -1 <= y <= 1:
+        place_structures(x, y, "oak_tree", 1, chance=33)
+        place_structures(x, y, "tall_grass", 4, chance=25)
+
+def place_ores(x: int, y: int) -> None:
+    """The ORES stage: places the ores that start in the chunk (x, y), with their chances already worked out (see load_ore_distribution)"""
+
+    for name, attempts, chance in ORE_DISTRIBUTION.get(y, ()):
+        if name not in major_structure_generators:
+            place_structures(x, y, name, attempts, chance)
+
+def place_blobs(x: int, y: int) -> None:
+    """The BLOBS stage: places the blobs of granite, diorite, andesite and tuff that start in the chunk (x, y)"""
 
-    return chunk_data
+    for name, attempts, chance in ORE_DISTRIBUTION.get(y, ()):
+        if name in major_structure_generators:
+            place_structures(x, y, name, attempts, chance)
 
-@cache
-def terrain_generate(x: int) -> tuple[float, float]:
-    """Takes the x position of a block and returns the result of the simplex noise and also the height it has to generate at"""
-    simplex_noise_height = snoise.noise2array(np.array([x * 0.1]), np.array([0]))
-    return simplex_noise_height, -int(simplex_noise_height * 5) + 5
+def finalize_chunk(x: int, y: int) -> None:
+    """The FINALIZED stage: merges the blocks of the structures that cover the chunk (x, y) into its terrain"""
 
-@cache
-def cave_generate(coords: tuple) -> float:
-    """Takes the coordinates of a block and returns the noise map value for cave generation"""
-    noise_height = pnoise.noise2(coords[0], coords[1])
-    noise_height = noise_height + 0.5 if noise_height > 0 else 0
-    noise_height = int(pow(noise_height * 255, 0.9))
-    return noise_height
+    if (terrain := Chunk.generated_terrain.get((x, y))) is None:
+        terrain = generate_terrain([(x, y)])[0] # The cache let go of it since the terrain stages ran
+    Chunk.generated_terrain[(x, y)] = merge_edits(terrain, structure_overlay((x, y)))
 
-def blended_blocks_generate(y: int, block: str, blend_y: int, block2: str = "") -> str:
+def blended_blocks_generate(x: int, y: int, block: str, blend_y: int, feature: int, block2: str = "") -> str:
     """Returns a block based on a 5 block blend of two blocks
 
     Args:
+        x (int): The x of the block
         y (int): The y of the block
         block (str): The first block to blend from
         blend_y (int): The y at where the blend should happen
+        feature (int): The feature id that keys the random numbers of this blend
         block2 (str, optional): The second block to blend to. Defaults to "".
 
     Returns:
@@ -498,113 +675,503 @@ def blended_blocks_generate(y: int, block: str, blend_y: int, block2: str = "")
     """
 
     block_name = ""
-    if y >= blend_y - 5:   # If the block is within 5 blocks of the blend level:
-        match blend_y - y: # Match on the block's level above the blend level
-            case 1 | 2:    # If the block is 1 / 2 blocks above blend level, ect.
-                block_name = choices([block, block2], [70, 30])[0]
-            case 3:
-                block_name = choices([block, block2], [50, 50])[0]
-            case 4:
-                block_name = choices([block, block2], [30, 70])[0]
-            case _:              # If the block is within 5 blocks of the blend level but not one
-                if y >= blend_y: # of the above it will be either layer 5 or below
-                    block_name = block
+    if y >= blend_y:                   # If the block is at or below the blend level it is always the first block
+        block_name = block
+    elif blend_y - y in BLEND_CHANCES: # If the block is 1 to 4 blocks above the blend level, roll for it
+        block_name = block if rng.random(x, y, feature) * 100 < BLEND_CHANCES[blend_y - y] else block2
 
     return block_name
 
-@cache
+@RegionCache("generate_block", lambda pos: block_region(*pos))
 def generate_block(x: int, y: int) -> str:
     """Gets the name of the block that would generate (apart from structures) at the given location"""
 
-    seed(SEED + canter_pairing((x, y)))
     block_name = ""
 
     # Generating bedrock
-    block_name = blended_blocks_generate(y, "bedrock", MAX_Y)
+    block_name = blended_blocks_generate(x, y, "bedrock", MAX_Y, BEDROCK_FEATURE)
 
     # If the block has been chosen (ie. is bedrock) return, else generate it
     if block_name:
         return block_name
 
     # Generate the layer of blended deepslate underneath stone
-    block_name = blended_blocks_generate(y, "deepslate", MAX_Y // 2, block2="stone")
+    block_name = blended_blocks_generate(x, y, "deepslate", MAX_Y // 2, DEEPSLATE_FEATURE, block2="stone")
+
+    height, dirt_height, cave_above_surface, cave_at_surface = heightmap.column(x)
+    # Blocks above the surface decorations are always sky, so the cave noise map isn't needed for them
+    if y < height - 1:
+        return ""
 
-    # Cave noise map
-    cave_noise_map_coords = (x / 70, y / 70)
     # Don't generate blocks if it satifies a certain range of values in the cave noise map, AKA a cave
-    cave_noise_map_value = cave_generate(cave_noise_map_coords)
-
-    if not (92.7 < cave_noise_map_value < 103):
-        # Height of the terrain
-        height = terrain_generate(x)
-        # The lowest height of dirt
-        dirt_height = -int(height[0] * 3.2) + 10
-        if y == height[1]:
+    # (the heightmap already knows if there are caves at the surface)
+    is_cave = cave_above_surface if y == height - 1 else cave_at_surface if y == height else cave_tiles.is_cave(x, y)
+    if not is_cave:
+        if y == height:
             block_name = "grass_block"
-        elif height[1] + 1 <= y < dirt_height:
+        elif height + 1 <= y < dirt_height:
             block_name = "dirt"
         elif MAX_Y // 2 - 4 > y >= dirt_height:
             block_name = "stone"
         elif y >= MAX_Y // 2:
             block_name = "deepslate"
-        if y == height[1] - 1:
-            if not (92.7 < cave_generate((x / 70, (y + 1) / 70)) < 103):
-                if rand_bool(1 / 3):
-                    block_name = "grass"
-                if rand_bool(1 / 21):
-                    block_name = choices(["poppy", "dandelion"], weights=[1, 2])[0]
+        if y == height - 1:
+            if not cave_at_surface:
+                block_name = decoration_generate(x, y, block_name)
     else:
         block_name = ""
 
     return block_name
 
-def load_chunks(camera: Camera) -> list:
+def merge_edits(terrain: np.ndarray, edits: np.ndarray) -> np.ndarray:
+    """Puts the blocks of a structure overlay on top of the terrain of a chunk"""
+    return np.where(edits == NO_EDIT, terrain, edits).astype(terrain.dtype)
+
+def structure_overlay(chunk: tuple[int, int]) -> np.ndarray:
+    """Gets the blocks of the structures in a whole chunk at once, as an array of block ids indexed by [y, x] with NO_EDIT where there are none
+
+    The array is the one stored in Structure.overlay when the chunk has structures, so it shouldn't be modified.
+    """
+    if (overlay := Structure.overlay.get(chunk)) is not None:
+        return overlay
+    return np.full((CHUNK_SIZE, CHUNK_SIZE), NO_EDIT, dtype=np.int32)
+
+def decoration_generate(x: int, y: int, block_name: str) -> str:
+    """Rolls for grass and flowers on the block above the surface at the given location"""
+
+    if rng.rand_bool(1 / 3, x, y, GRASS_FEATURE):
+        block_name = "grass"
+    if rng.rand_bool(1 / 21, x, y, FLOWER_FEATURE):
+        block_name = rng.choices(["poppy", "dandelion"], [1, 2], x, y, FLOWER_FEATURE, draw=1)
+
+    return block_name
+
+def terrain_generate_array(xs: np.ndarray) -> np.ndarray:
+    """Takes an array of x positions and returns the simplex noise that the height of the terrain comes from for every one of them"""
+    return snoise.noise2array(xs.ravel() * 0.1, np.array([0]))[0].reshape(xs.shape)
+
+def cave_generate_array(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Takes arrays of block positions and returns the noise map values for cave generation"""
+    noise_height = pnoise.noise2(xs / 70, ys / 70, grid_mode=False)
+    noise_height = np.where(noise_height > 0, noise_height + 0.5, 0)
+    return np.power(noise_height * 255, 0.9).astype(int)
+
+class Heightmap:
+    """Caches the height of the terrain, the lowest height of dirt and whether there are caves at the surface of every column
+
+    The columns are generated a chunk column (CHUNK_SIZE columns) at a time, and a whole batch of chunk columns is generated
+    with one vectorized noise call for the heights and one for the caves.
+    """
+
+    def __init__(self) -> None:
+        # Chunk x: (height, dirt height, cave above the surface, cave at the surface), each an array with one value per column
+        self.columns = RegionCache("heightmap", lambda chunk_x: (chunk_x // CACHE_REGION_SIZE, 0))
+
+    def generate(self, chunk_xs: list[int]) -> dict:
+        """Generates the given chunk columns in one go and returns them"""
+
+        xs = np.array(chunk_xs, dtype=int)[:, None] * CHUNK_SIZE + np.arange(CHUNK_SIZE)
+        height_noise = terrain_generate_array(xs)
+        heights = -np.trunc(height_noise * 5).astype(int) + 5
+        dirt_heights = -np.trunc(height_noise * 3.2).astype(int) + 10
+        # The block above the surface (where grass and flowers go) and the surface block itself
+        caves = cave_generate_array(np.stack((xs, xs)), np.stack((heights - 1, heights)))
+        is_cave = (92.7 < caves) & (caves < 103)
+        columns = {}
+        for i, chunk_x in enumerate(chunk_xs):
+            columns[chunk_x] = self.columns[chunk_x] = (heights[i], dirt_heights[i], is_cave[0, i], is_cave[1, i])
+        return columns
+
+    def column(self, x: int) -> tuple[int, int, bool, bool]:
+        """Gets the height, the lowest height of dirt, and whether there is a cave above the surface and at the surface of the given column"""
+
+        chunk_x = x // CHUNK_SIZE
+        if (columns := self.columns.get(chunk_x)) is None:
+            columns = self.generate([chunk_x])[chunk_x]
+        return tuple(values[x % CHUNK_SIZE].item() for values in columns)
+
+    def arrays(self, chunk_xs: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Gets the heights, the lowest heights of dirt, and whether there are caves above the surface and at the surface of the
+        given chunk columns, as arrays with the shape (len(chunk_xs), CHUNK_SIZE)"""
+
+        chunk_xs = [int(chunk_x) for chunk_x in chunk_xs]
+        columns = {chunk_x: self.columns.get(chunk_x) for chunk_x in chunk_xs}
+        if (missing := [chunk_x for chunk_x, column in columns.items() if column is None]):
+            columns.update(self.generate(missing))
+        return tuple(np.array([columns[chunk_x][i] for chunk_x in chunk_xs]).reshape(-1, CHUNK_SIZE) for i in range(4))
+
+heightmap = Heightmap()
+
+class CaveTiles:
+    """Caches the cave noise map in square tiles of CAVE_TILE_SIZE by CAVE_TILE_SIZE blocks
+
+    Every tile is generated with a single vectorized noise call. The tiles are evicted once they are far enough from the
+    camera, and the tiles in the direction the camera is moving are generated a few at a time before they are needed.
+    """
+
+    def __init__(self) -> None:
+        self.tiles: dict[tuple[int, int], np.ndarray] = {} # Tile position: cave noise map values indexed by [y, x]
+        self.hits = 0
+        self.misses = 0
+        self.camera_tile = (0, 0)
+        self.last_center = None
+        self.direction = (0, 0)
+
+    def generate(self, tiles: list[tuple[int, int]]) -> None:
+        """Generates the noise of all the given tiles in one go"""
+
+        positions = np.array(tiles).reshape(-1, 2)
+        xs = positions[:, 0, None, None] * CAVE_TILE_SIZE + np.arange(CAVE_TILE_SIZE)
+        ys = positions[:, 1, None, None] * CAVE_TILE_SIZE + np.arange(CAVE_TILE_SIZE)[:, None]
+        for tile, values in zip(tiles, cave_generate_array(*np.broadcast_arrays(xs, ys)).astype(np.int16)):
+            self.tiles[tile] = values
+
+    def value(self, x: int, y: int) -> int:
+        """Gets the cave noise map value of the block at the given position"""
+
+        tile = (x // CAVE_TILE_SIZE, y // CAVE_TILE_SIZE)
+        if tile in self.tiles:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.generate([tile])
+        return int(self.tiles[tile][y % CAVE_TILE_SIZE, x % CAVE_TILE_SIZE])
+
+    def is_cave(self, x: int, y: int) -> bool:
+        """Checks if the value of the cave noise map at the given position is in the range of a cave"""
+        return 92.7 < self.value(x, y) < 103
+
+    def update(self, center: tuple[float, float]) -> None:
+        """Evicts the tiles that are far from the camera and prefetches the ones the camera is moving towards
+
+        Args:
+            center (tuple[float, float]): the position of the middle of the screen in blocks
+        """
+
+        self.camera_tile = (int(center[0] // CAVE_TILE_SIZE), int(center[1] // CAVE_TILE_SIZE))
+        if self.last_center is not None and center != self.last_center:
+            self.direction = ((center[0] > self.last_center[0]) - (center[0] < self.last_center[0]),
+                              (center[1] > self.last_center[1]) - (center[1] < self.last_center[1]))
+        self.last_center = center
+
+        for tile in list(self.tiles):
+            if max(abs(tile[0] - self.camera_tile[0]), abs(tile[1] - self.camera_tile[1])) > CAVE_TILE_KEEP_DISTANCE:
+                del self.tiles[tile]
+
+        # The tiles around the camera, then around each step ahead of it, a limited number of them per frame
+        prefetch = []
+        for step in range(CAVE_TILE_PREFETCH + 1):
+            ahead = (self.camera_tile[0] + self.direction[0] * step, self.camera_tile[1] + self.direction[1] * step)
+            for y in range(-1, 2):
+                for x in range(-1, 2):
+                    tile = (ahead[0] + x, ahead[1] + y)
+                    if tile not in self.tiles and tile not in prefetch and len(prefetch) < CAVE_TILE_PREFETCH_BATCH:
+                        prefetch.append(tile)
+        if prefetch:
+            self.generate(prefetch)
+
+    def __str__(self) -> str:
+        return f"{len(self.tiles)} tiles, {self.hits / (self.hits + self.misses) if self.hits + self.misses else 0:.1%} hits"
+
+cave_tiles = CaveTiles()
+
+def blended_blocks_generate_array(x: np.ndarray, y: np.ndarray, blend_y: int, feature: int) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized version of the roll in blended_blocks_generate
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: a mask of the blocks that are 1 to 4 blocks above the blend level, and a mask of the ones where the first block was chosen
+    """
+
+    chances = np.select([blend_y - y == distance for distance in BLEND_CHANCES], list(BLEND_CHANCES.values()), 0)
+    blending = chances > 0
+    first = np.zeros(y.shape, dtype=bool)
+    first[blending] = rng.random_array(x[blending], y[blending], feature) * 100 < chances[blending]
+    return blending, first
+
+def chunk_grid(chunks: np.ndarray) -> tuple[np.ndarray, ...]:
+    """The x and y of every block of every chunk, and the heightmap of its column (see Heightmap.arrays), broadcasted to the shape
+    (len(chunks), CHUNK_SIZE, CHUNK_SIZE) and indexed by [chunk, y, x]"""
+
+    shape = (len(chunks), CHUNK_SIZE, CHUNK_SIZE)
+    x = np.broadcast_to((chunks[:, 0, None] * CHUNK_SIZE + np.arange(CHUNK_SIZE))[:, None, :], shape)
+    y = np.broadcast_to((chunks[:, 1, None] * CHUNK_SIZE + np.arange(CHUNK_SIZE))[:, :, None], shape)
+    return x, y, *(np.broadcast_to(column[:, None, :], shape) for column in heightmap.arrays(chunks[:, 0]))
+
+def terrain_noise(chunks: np.ndarray) -> np.ndarray:
+    """The NOISE stage: the layers of the terrain from the heightmap, the blended layer of deepslate and the bedrock, without any caves
+
+    Args:
+        chunks (np.ndarray): the positions of the chunks, as an array of (x, y)
+
+    Returns:
+        np.ndarray: an array of block ids (see BLOCK_NAMES) with the shape (len(chunks), CHUNK_SIZE, CHUNK_SIZE), indexed by [chunk, y, x]
+    """
+
+    x, y, height, dirt_height, _, _ = chunk_grid(chunks)
+    terrain = np.select(
+        [y == height, (height + 1 <= y) & (y < dirt_height), (MAX_Y // 2 - 4 > y) & (y >= dirt_height), y >= MAX_Y // 2],
+        [BLOCK_IDS["grass_block"], BLOCK_IDS["dirt"], BLOCK_IDS["stone"], BLOCK_IDS["deepslate"]], 0
+    ).astype(np.uint16)
+
+    # The blended layer of deepslate underneath stone
+    blending, first = blended_blocks_generate_array(x, y, MAX_Y // 2, DEEPSLATE_FEATURE)
+    blending &= terrain == 0 # Grass and dirt still take priority over it
+    terrain[blending] = np.where(first[blending], BLOCK_IDS["deepslate"], BLOCK_IDS["stone"])
+
+    # Bedrock (and its blended layer), which the caves don't go through
+    blending, first = blended_blocks_generate_array(x, y, MAX_Y, BEDROCK_FEATURE)
+    terrain[(y >= MAX_Y) | first] = BLOCK_IDS["bedrock"]
+    return terrain
+
+def carve_caves(chunks: np.ndarray, terrain: np.ndarray) -> None:
+    """The CAVES stage: carves the caves out of the terrain of the chunks in place"""
+
+    # The cave noise map is only needed where there are blocks to carve out
+    if (solid := (terrain != 0) & (terrain != BLOCK_IDS["bedrock"])).any():
+        x, y = (grid[solid] for grid in chunk_grid(chunks)[:2])
+        caves = cave_generate_array(x, y)
+        carved = np.zeros(terrain.shape, dtype=bool)
+        carved[solid] = (92.7 < caves) & (caves < 103)
+        terrain[carved] = 0
+
+def decorate(chunks: np.ndarray, terrain: np.ndarray) -> None:
+    """The DECORATION stage: puts grass and flowers on the block above the surface of the terrain of the chunks in place"""
+
+    x, y, height, _, cave_above_surface, cave_at_surface = chunk_grid(chunks)
+    # Not where a cave cuts through the block itself or the surface block under it (the heightmap already knows where these are)
+    decorated = (y == height - 1) & ~cave_above_surface & ~cave_at_surface
+    decorated_x, decorated_y = x[decorated], y[decorated]
+    grass = rng.random_array(decorated_x, decorated_y, GRASS_FEATURE) < 1 / 3
+    flower = rng.random_array(decorated_x, decorated_y, FLOWER_FEATURE) < 1 / 21
+    poppy = rng.random_array(decorated_x, decorated_y, FLOWER_FEATURE, draw=1) * 3 < 1
+    terrain[decorated] = np.select([flower & poppy, flower, grass], [BLOCK_IDS["poppy"], BLOCK_IDS["dandelion"], BLOCK_IDS["grass"]], terrain[decorated])
+
+def generate_terrain(chunks: list[tuple[int, int]]) -> np.ndarray:
+    """Generates the terrain (apart from structures) of a batch of chunks in one go, giving the exact same blocks as generate_block
+
+    It runs the terrain stages of the chunk pipeline (see ChunkStatus) one after the other, the worker processes use it to
+    generate whole terrains at once.
+
+    Args:
+        chunks (list[tuple[int, int]]): the positions of the chunks to generate
+
+    Returns:
+        np.ndarray: an array of block ids (see BLOCK_NAMES) with the shape (len(chunks), CHUNK_SIZE, CHUNK_SIZE), indexed by [chunk, y, x]
+    """
+
+    chunks = np.array(chunks, dtype=int).reshape(-1, 2)
+    terrain = terrain_noise(chunks)
+    carve_caves(chunks, terrain)
+    decorate(chunks, terrain)
+    return terrain
+
+class ChunkStatus(IntEnum):
+    """The stages that chunks are generated in, in order, a chunk only goes through the stages that it is needed for
+
+    The structures that start in a chunk can cover the chunks around it, so the chunks around the rendered area stop at BLOBS,
+    and a chunk is only finalized once every chunk within STRUCTURE_REACH of it has had its structures placed (see load_chunks).
+    The structures only look up the blocks they cover (see StructureGenerator.place), so they are placed before the terrain
+    stages, and the chunks around the rendered area never generate their terrain at all.
+    """
+
+    EMPTY = 0
+    SURFACE = 1    # The trees and tall grass that start in the chunk are placed
+    ORES = 2       # The ores that start in the chunk are placed
+    BLOBS = 3      # The blobs that start in the chunk are placed
+    NOISE = 4      # The layers of the terrain without any caves (terrain_noise)
+    CAVES = 5      # The caves are carved out of the terrain (carve_caves)
+    DECORATION = 6 # The grass and flowers on the surface (decorate), the terrain is complete from here on
+    FINALIZED = 7  # The structures that cover the chunk are merged into its terrain, it is ready to be made into a Chunk
+
+class ChunkPipeline:
+    """Keeps the status of every chunk and moves chunks through the stages of ChunkStatus, adding up the time spent in each stage"""
+
+    def __init__(self) -> None:
+        self.status: dict[tuple[int, int], ChunkStatus] = {}
+        self.times = {stage: 0.0 for stage in ChunkStatus if stage} # Seconds spent in each stage
+        self.counts = {stage: 0 for stage in ChunkStatus if stage}  # Chunks that went through each stage
+
+    def get(self, chunk: tuple[int, int]) -> ChunkStatus:
+        if (status := self.status.get(chunk)) is not None:
+            return status
+        # The status of a generated chunk is dropped once it is made, so that the statuses don't pile up with every chunk visited
+        if (instance := Chunk.instances.get(chunk)) is not None and not instance.from_save:
+            return ChunkStatus.FINALIZED
+        return ChunkStatus.EMPTY
+
+    def structures_placed_around(self, chunk: tuple[int, int]) -> bool:
+        """Whether every chunk whose structures can reach the chunk has placed them, after that no structure looks up its blocks again"""
+
+        return all(self.get((chunk[0] + x, chunk[1] + y)) >= ChunkStatus.BLOBS
+                   for y in range(-STRUCTURE_REACH[1], STRUCTURE_REACH[1] + 1) for x in range(-STRUCTURE_REACH[0], STRUCTURE_REACH[0] + 1))
+
+    def add_terrain(self, chunk: tuple[int, int], terrain: np.ndarray) -> None:
+        """Takes the terrain of a chunk that was generated somewhere else (by generate_terrain in a worker process), in place of its terrain stages
+
+        The chunk keeps its status, since its structures might not have been placed yet, the terrain stages skip it later on.
+        """
+
+        if self.get(chunk) < ChunkStatus.DECORATION:
+            Chunk.generated_terrain[chunk] = terrain
+
+    def advance(self, chunks: list[tuple[int, int]], status: ChunkStatus) -> None:
+        """Brings the chunks up to the given status, each stage runs on all the chunks that need it before the next stage starts
+
+        Args:
+            chunks (list[tuple[int, int]]): the positions of the chunks, the structures are placed in this order
+            status (ChunkStatus): the status that the chunks need to be at
+        """
+
+        chunks = [chunk for chunk in dict.fromkeys(chunks) if self.get(chunk) < status]
+
+        # The structure stages run chunk by chunk
+        for stage, func in ((ChunkStatus.SURFACE, place_surface_structures), (ChunkStatus.ORES, place_ores), (ChunkStatus.BLOBS, place_blobs)):
+            if stage > status:
+                return
+            for chunk in chunks:
+                if self.get(chunk) < stage:
+                    self.run(stage, 1, func, *chunk)
+                    self.status[chunk] = stage
+
+        # The terrain stages run on all the chunks in one batch, and always together, since the arrays in between aren't kept.
+        # Chunks whose terrain came from a worker skip them
+        if status < ChunkStatus.NOISE:
+            return
+        if (batch := [chunk for chunk in chunks if self.get(chunk) < ChunkStatus.DECORATION and chunk not in Chunk.generated_terrain]):
+            positions = np.array(batch, dtype=int).reshape(-1, 2)
+            terrain = self.run(ChunkStatus.NOISE, len(batch), terrain_noise, positions)
+            self.run(ChunkStatus.CAVES, len(batch), carve_caves, positions, terrain)
+            self.run(ChunkStatus.DECORATION, len(batch), decorate, positions, terrain)
+            for chunk, chunk_terrain in zip(batch, terrain):
+                Chunk.generated_terrain[chunk] = chunk_terrain
+        for chunk in chunks:
+            self.status[chunk] = max(self.get(chunk), ChunkStatus.DECORATION)
+
+        if status >= ChunkStatus.FINALIZED:
+            for chunk in chunks:
+                self.run(ChunkStatus.FINALIZED, 1, finalize_chunk, *chunk)
+                self.status[chunk] = ChunkStatus.FINALIZED
+                # The structures are in the chunk's terrain now, and when the chunks around it have placed theirs (as load_chunks and
+                # pregen make sure of) its overlay is never looked up again, so it is dropped instead of being kept for every chunk visited
+                if self.structures_placed_around(chunk):
+                    Structure.overlay.pop(chunk, None)
+                    Structure.instances.pop(chunk, None)
+
+    def run(self, stage: ChunkStatus, count: int, func: callable, *args) -> np.ndarray | None:
+        start = perf_counter()
+        result = func(*args)
+        self.times[stage] += perf_counter() - start
+        self.counts[stage] += count
+        return result
+
+    def __str__(self) -> str:
+        return ", ".join(f"{stage.name.lower()} {self.counts[stage]} in {self.times[stage] * 1000:.0f}ms" for stage in self.times)
+
+chunk_pipeline = ChunkPipeline()
+
+def load_chunks(camera: Camera, workers: ChunkWorkers | None = None, storage: WorldStorage | None = None) -> list:
     """Generate, unload and delete chunks.
 
     Args:
         camera (Camera): The camera used to calculate which chunks should be rendered
+        workers (ChunkWorkers | None, optional): The worker pool to generate chunks in the background with, if there is one
+        storage (WorldStorage | None, optional): The saved world to load chunks from instead of generating them, if there is one
 
     Returns:
         list: The list of rendered chunks.
     """
 
     rendered_chunks = []
-    # Load the chunks that show up on the screen
-    chunks_to_load = (WIDTH // (CHUNK_SIZE * BLOCK_SIZE) + 2 + 2 * MAX_STRUCTURE_SIZE[0], HEIGHT // (CHUNK_SIZE * BLOCK_SIZE) + 2 + 2 * MAX_STRUCTURE_SIZE[1])
-    for y in range(-chunks_to_load[1] // 2, chunks_to_load[1] // 2):
-        for x in range(-chunks_to_load[0] // 2, chunks_to_load[0] // 2):
-            chunk = (
-                int(round(camera.pos.x / (CHUNK_SIZE * BLOCK_SIZE) + 1) + x),
-                int(round(camera.pos.y / (CHUNK_SIZE * BLOCK_SIZE) + 1) + y)
-            )
-            chunks_to_render = inttup(VEC(chunks_to_load) - VEC(2 * MAX_STRUCTURE_SIZE[0], 2 * MAX_STRUCTURE_SIZE[1]))
-            if y in range(-chunks_to_render[1] // 2, chunks_to_render[1] // 2) and x in range(-chunks_to_render[0] // 2, chunks_to_render[0] // 2):
-                rendered_chunks.append(chunk)
-            # If the chunk has not yet been generated, create the chunk object
+    new_chunks = []
+    # Load the chunks that show up on the screen, only these are generated
+    chunks_to_render = (WIDTH // (CHUNK_SIZE * BLOCK_SIZE) + 2, HEIGHT // (CHUNK_SIZE * BLOCK_SIZE) + 2)
+    camera_chunk = (int(round(camera.pos.x / (CHUNK_SIZE * BLOCK_SIZE) + 1)), int(round(camera.pos.y / (CHUNK_SIZE * BLOCK_SIZE) + 1)))
+    for y in range(-chunks_to_render[1] // 2, chunks_to_render[1] // 2):
+        for x in range(-chunks_to_render[0] // 2, chunks_to_render[0] // 2):
+            chunk = (camera_chunk[0] + x, camera_chunk[1] + y)
+            rendered_chunks.append(chunk)
+            # If the chunk has not yet been generated, create the chunk object (after the loop)
             if chunk not in Chunk.instances:
-                Chunk.instances[chunk] = Chunk(chunk)
-                Chunk.cave_pregeneration_bool = True
+                new_chunks.append(chunk)
             elif Chunk.instances[chunk] not in SPRITE_MANAGER:
                 SPRITE_MANAGER.add(Chunk.instances[chunk])
+    # Structures can reach into the rendered chunks from up to STRUCTURE_REACH chunks away, so these chunks need their structures
+    structure_chunks = [(camera_chunk[0] + x, camera_chunk[1] + y)
+                        for y in range(-chunks_to_render[1] // 2 - STRUCTURE_REACH[1], chunks_to_render[1] // 2 + STRUCTURE_REACH[1])
+                        for x in range(-chunks_to_render[0] // 2 - STRUCTURE_REACH[0], chunks_to_render[0] // 2 + STRUCTURE_REACH[0])]
+
+    if storage:
+        # Chunks that have been saved only need to be loaded
+        for chunk in new_chunks.copy():
+            if (block_data := storage.load(chunk)) is not None:
+                Chunk.instances[chunk] = Chunk(chunk, block_data=block_data)
+                new_chunks.remove(chunk)
+
+    if workers:
+        # The blobs that the workers ran the Cellular Automata of ahead of time
+        for chunk, grids in workers.finished_blobs():
+            cache_blobs(*chunk, grids)
+
+    if new_chunks:
+        # Placing the structures only looks up the blocks they cover, so the chunks around the rendered area never need their terrain
+        chunk_pipeline.advance(structure_chunks, ChunkStatus.BLOBS)
+
+    if workers:
+        # Prefetch the blobs of the chunks that will need their structures placed once the camera moves a bit
+        prefetch_chunks = {(camera_chunk[0] + x, camera_chunk[1] + y)
+                           for y in range(-chunks_to_render[1] // 2 - STRUCTURE_REACH[1] - BLOB_PREFETCH_DISTANCE, chunks_to_render[1] // 2 + STRUCTURE_REACH[1] + BLOB_PREFETCH_DISTANCE)
+                           for x in range(-chunks_to_render[0] // 2 - STRUCTURE_REACH[0] - BLOB_PREFETCH_DISTANCE, chunks_to_render[0] // 2 + STRUCTURE_REACH[0] + BLOB_PREFETCH_DISTANCE)}
+        for chunk in list(workers.blob_requests):
+            if chunk not in prefetch_chunks:
+                workers.cancel_blobs(chunk)
+        # The closest chunks first, the rest are prefetched in later frames
+        for chunk in sorted(prefetch_chunks, key=lambda chunk: abs(chunk[0] - camera_chunk[0]) + abs(chunk[1] - camera_chunk[1])):
+            if chunk_pipeline.get(chunk) < ChunkStatus.BLOBS and not workers.prefetch_blobs(chunk):
+                break
 
-    while tuple(VEC(Chunk.cave_pregeneration_pos) // CHUNK_SIZE) in Chunk.instances:
-        Chunk.cave_pregeneration_pos[0] += CHUNK_SIZE
-    if Chunk.cave_pregeneration_pos[0] > (chunks_to_load[0] // 2 + 1) * CHUNK_SIZE:
-        Chunk.cave_pregeneration_pos[1] += 1
-        Chunk.cave_pregeneration_pos[0] = (-chunks_to_load[0] // 2 - 1) * CHUNK_SIZE
-    else:
-        Chunk.cave_pregeneration_pos[0] += CAVE_PREGEN_BATCH
-    if Chunk.cave_pregeneration_pos[1] > (chunks_to_load[1] // 2 + 1) * CHUNK_SIZE:
-        Chunk.cave_pregeneration_pos = [(-chunks_to_load[0] // 2 - 1) * CHUNK_SIZE, (-chunks_to_load[1] // 2 - 1) * CHUNK_SIZE]
-        Chunk.cave_pregeneration_bool = False
-    elif Chunk.cave_pregeneration_bool:
-        for i in range(CAVE_PREGEN_BATCH):
-            cave_generate(tuple((VEC(Chunk.cave_pregeneration_pos) - VEC(i, 0)) / 70))
+        # Cancel the chunks that the camera has already left
+        for chunk in list(workers.pending):
+            if chunk not in rendered_chunks:
+                workers.cancel(chunk)
+        # The terrain of the chunks that finished generating in the background
+        for chunk, terrain in workers.finished():
+            chunk_pipeline.add_terrain(chunk, terrain)
+
+        if new_chunks:
+            # The chunks around the middle of the screen are needed straight away for the player's collision, so they are generated
+            # here, the terrain of the rest is generated in the background
+            center = ((camera.pos.x + WIDTH / 2) // (CHUNK_SIZE * BLOCK_SIZE), (camera.pos.y + HEIGHT / 2) // (CHUNK_SIZE * BLOCK_SIZE))
+            needed = [chunk for chunk in new_chunks if abs(chunk[0] - center[0]) <= 1 and abs(chunk[1] - center[1]) <= 1]
+            for chunk in needed:
+                workers.cancel(chunk)
+            chunk_pipeline.advance(needed, ChunkStatus.DECORATION)
+            for chunk in new_chunks:
+                if chunk not in Chunk.generated_terrain:
+                    workers.request(chunk) # If there are no free slots it is requested again next frame
+            new_chunks = [chunk for chunk in new_chunks if chunk in Chunk.generated_terrain]
+
+        # Show placeholders for the rendered chunks that are still generating
+        for chunk in rendered_chunks:
+            if chunk not in Chunk.instances and chunk not in new_chunks and chunk not in ChunkPlaceholder.instances:
+                ChunkPlaceholder(chunk)
+        for chunk, placeholder in ChunkPlaceholder.instances.copy().items():
+            if chunk in Chunk.instances or chunk in new_chunks or chunk not in rendered_chunks:
+                placeholder.kill()
+
+    elif new_chunks:
+        # The terrain of all the new chunks is generated in one batch
+        chunk_pipeline.advance(new_chunks, ChunkStatus.DECORATION)
+
+    for chunk in new_chunks:
+        Chunk.instances[chunk] = Chunk(chunk)
+
+    # Keep the cave noise tiles around the camera and prefetch the ones it is moving towards
+    cave_tiles.update(((camera.pos.x + WIDTH / 2) / BLOCK_SIZE, (camera.pos.y + HEIGHT / 2) / BLOCK_SIZE))
 
     unrendered_chunks = []
     # Check a bigger area around the camera to see if there are chunks that are still active but shouldn't be
-    for y in range(-chunks_to_load[1] // 2 - 2, chunks_to_load[1] // 2 + 2):
-        for x in range(-chunks_to_load[0] // 2 - 2, chunks_to_load[0] // 2 + 2):
+    for y in range(-chunks_to_render[1] // 2 - STRUCTURE_REACH[1] - 2, chunks_to_render[1] // 2 + STRUCTURE_REACH[1] + 2):
+        for x in range(-chunks_to_render[0] // 2 - STRUCTURE_REACH[0] - 2, chunks_to_render[0] // 2 + STRUCTURE_REACH[0] + 2):
             chunk = (
                 x + camera.pos.x // (CHUNK_SIZE * BLOCK_SIZE),
                 y + camera.pos.y // (CHUNK_SIZE * BLOCK_SIZE)
@@ -620,6 +1187,37 @@ def load_chunks(camera: Camera) -> list:
 
     return rendered_chunks
 
+def save_chunks(storage: WorldStorage, journal: BlockJournal | None = None, wait: bool = False) -> int:
+    """Saves the chunks whose blocks have changed since they were generated, loaded or last saved
+
+    Args:
+        storage (WorldStorage): The region files to save the chunks to
+        journal (BlockJournal | None, optional): The journal of the block edits, if there is one. The chunks are then saved
+                                                 in the background, and the edits they contain are dropped from the journal.
+        wait (bool, optional): Whether to wait for the last save of the journal if it is still running, instead of leaving
+                               the chunks for the next save. Defaults to False.
+
+    Returns:
+        int: The number of chunks that were saved, or handed to the journal to be saved in the background
+    """
+
+    if journal:
+        # Chunks only count as saved once the compaction that saves them is done, if it fails they are saved again
+        for pos, version in journal.take_saved().items():
+            Chunk.instances[pos].saved_version = version
+
+    dirty = {pos: chunk for pos, chunk in Chunk.instances.items() if chunk.block_data.version != chunk.saved_version}
+    if dirty:
+        if journal:
+            # The background thread gets copies, the chunks can keep changing in the meantime
+            if not journal.compact(storage, {pos: chunk.block_data.copy() for pos, chunk in dirty.items()}, wait):
+                return 0
+        else:
+            storage.save({pos: chunk.block_data for pos, chunk in dirty.items()})
+            for chunk in dirty.values():
+                chunk.saved_version = chunk.block_data.version
+    return len(dirty)
+
 # Major structure means structures that have bigger chunk spans than the rest of its conflicting STRUCTURES
 major_structure_generators = {
     "oak_tree": StructureGenerator("oak_tree", obstruction=True),
@@ -646,4 +1244,12 @@ minor_structure_generators = {
     "deepslate_diamond_ore": BlobGenerator("deepslate_diamond_ore", (3, 3), 4, 1),
     "deepslate_emerald_ore": BlobGenerator("deepslate_emerald_ore", (2, 2), 1, 1),
 }
-structure_generators = {**major_structure_generators, **minor_structure_generators}
\ No newline at end of file
+structure_generators = {**major_structure_generators, **minor_structure_generators}
+# How many chunks away from the chunk they start in structures can reach, the minor structures share the chunk spans of the major
+# structures they conflict with (see CONFLICTING_STRUCTURES), so only the major structures have to be checked
+STRUCTURE_REACH = tuple(max(generator.chunks_to_check[axis] for generator in major_structure_generators.values()) - 1 for axis in (0, 1))
+# The shape of the blobs of one chunk in the shared buffer of the chunk workers (see generate_blobs): the most blobs that can
+# start in a chunk, by the height and width of the biggest blob
+blob_generators = [generator for generator in major_structure_generators.values() if isinstance(generator, BlobGenerator)]
+BLOB_SLOT_SHAPE = (max(1, *(sum(attempts for name, attempts, _ in ores if isinstance(structure_generators[name], BlobGenerator)) for ores in ORE_DISTRIBUTION.values())),
+                   max(generator.max_size[1] for generator in blob_generators), max(generator.max_size[0] for generator in blob_generators))
\ No newline at end of file